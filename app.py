@@ -1,30 +1,139 @@
 #python -m streamlit run app.py
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
 import datetime
-from streamlit_js_eval import get_geolocation
-import ephem, pytz, os, requests
-from constants import CIUDADES, CON_ES, MESSIER_OBJ, PLANETS
+import pytz
+from constants import CIUDADES, CON_ES
 from engine import SkyEngine
 from styles import apply_custom_css, get_plotly_layout, get_cardinal_label
 from data_manager import DataManager
-from sky_plotter import SkyPlotter
+from pipeline import build_sky_figure, get_kernel, refresh_live_layers
+from instrumentation import StageRecorder, debug_enabled
+from profiling import maybe_profile, profiling_requested
+from astrometry import EpochPropagator
+from visibility import VisibilityCalculator, TWILIGHT_NAMES
+from image_cache import ImageCache
+from star_index import StarIndex
+from photometry import StarPhotometry
+from search_index import SearchIndex
+from constants import PLANET_NAMES
+from constants import MESSIER_IMAGES
+from grid import LAYERS as GRID_LAYERS, DEFAULT_LAYERS as DEFAULT_GRID_LAYERS
+from sky_component import CatalogAsset, sky_projection
+from figure_cache import FigureCache
+from timezones import observer_tz, resolve as resolve_timezone
+from live import LiveSky, CADENCES as LIVE_CADENCES, DEFAULT_CADENCE as LIVE_CADENCE
+import uuid
 
 # 1. Configuración de página
 st.set_page_config(page_title="SkyView Pro v17", layout="wide", page_icon="🔭")
 apply_custom_css()
 
 # 2. Carga de datos (Cacheada)
+MAG_MAX = 7.0  # Límite del slider de brillo: lo más débil que se puede pedir
+
 @st.cache_data
 def get_catalogs():
-    stars = DataManager.load_stars(CON_ES)
-    constellations = DataManager.load_constellations(CON_ES)
-    return stars, constellations
+    DataManager.download_all()  # Las tres fuentes en paralelo (solo las que falten)
+    # Estrellas, constelaciones y exoplanetas se preparan en paralelo.
+    # El filtro de magnitud se resuelve en el backend (no se carga el catálogo entero)
+    return DataManager.load_all(CON_ES, mag_max=MAG_MAX)
+
+@st.cache_resource
+def get_epoch_propagator():
+    # Movimiento propio: compartido entre sesiones, cachea por época redondeada
+    return EpochPropagator(get_catalogs()[0])
+
+@st.cache_resource
+def get_visibility_calculator():
+    # Tabla de "qué se ve esta noche", cacheada por (sitio, fecha)
+    return VisibilityCalculator(get_catalogs()[0])
+
+@st.cache_resource
+def get_star_index():
+    # id / nombre -> fila y árbol 3D: clics, búsqueda y warp sin recorrer el catálogo
+    return StarIndex(get_catalogs()[0])
+
+# Traza de estrellas de fondo (sin customdata, ver SkyPlotter.draw_stars y FigureCache)
+BACKGROUND_STARS_UID = "draw_stars-1"
+SKY_CHART_KEY = "sky_chart"
+
+def pick_star(point, fig=None, live=None):
+    """Valor para 'sel' a partir del punto clickeado (None si no hay nada cerca).
+
+    'fig' es la figura mostrada: sin customdata, solo un punto de la traza de estrellas
+    de fondo se resuelve por vecino más cercano (no fotos, etiquetas ni cielo profundo).
+    'live' (LiveSky): el punto está rotado al último tic y se lleva a la hora del kernel.
+    """
+    index = get_star_index()
+    key = point.get("customdata")
+    if key is not None:
+        row = index.row(key)
+        return index.label(row) if row is not None else key  # Sin fila: es un planeta
+    if 'z' in point:
+        # Cubo 3D: coordenadas relativas a la estrella del centro, en la época dibujada
+        ra, dec, dist_ly, epoch = get_epoch_propagator().at(dt_utc)
+        space = index.space(epoch, ra, dec, dist_ly)
+        row = index.row(st.session_state.sel)
+        center = space.points[row] if row is not None else (0.0, 0.0, 0.0)
+        row = index.nearest_3d(point['x'], point['y'], point['z'], center, max_dist=1.0, space=space)
+    else:
+        curve = point.get("curve_number")
+        if fig is None or curve is None or curve >= len(fig.data) or fig.data[curve].uid != BACKGROUND_STARS_UID:
+            return None
+        # Estrella de fondo (sin customdata): vecino más cercano en la proyección actual
+        kernel = st.session_state.kernel
+        frame = (dt_utc, st.session_state.lat, st.session_state.lon, st.session_state.mode,
+                 st.session_state.view, st.session_state.mag)
+        cached = st.session_state.get('screen_index')
+        if cached is None or cached[0] != frame:
+            mask = (kernel.alt > -1) & (df_stars['mag'].to_numpy() <= st.session_state.mag)
+            cached = (frame, StarIndex.screen_index(kernel.px, kernel.py, mask))
+            st.session_state.screen_index = cached
+        xy = live.to_base(point['x'], point['y']) if live is not None else (point['x'], point['y'])
+        row = cached[1].query(xy, max_dist=2.0)
+    return index.label(row) if row is not None else None
+
+def select_point(event, fig, live=None):
+    """Guarda la selección del gráfico y vuelve a correr solo si cambió"""
+    points = event["selection"]["points"] if event and "selection" in event else []
+    if not points: return
+    sel = pick_star(points[0], fig, live)
+    if sel is not None and sel != st.session_state.sel:
+        st.session_state.sel = sel
+        st.rerun()
+
+@st.cache_resource
+def get_search_index():
+    # Nombres, HIP, Bayer/Flamsteed y constelaciones: se arma una vez por catálogo
+    return SearchIndex(get_catalogs()[0], extra=PLANET_NAMES)
+
+@st.cache_resource
+def get_catalog_asset():
+    # Catálogo binario para la proyección en el navegador: se arma y se escribe una vez
+    df, const, _ = get_catalogs()
+    return CatalogAsset(df, const, photometry=get_photometry())
+
+@st.cache_resource
+def get_photometry():
+    # Colores del catálogo y tamaños por (límite, escala): compartidos entre sesiones
+    df, _, _ = get_catalogs()
+    return StarPhotometry(df)
+
+@st.cache_data
+def get_deep_sky():
+    return DataManager.load_deep_sky(CON_ES)
 
-df_stars, const_data = get_catalogs()
-df_exo = DataManager.load_exoplanets() # Nueva carga
+@st.cache_resource
+def get_image_cache():
+    # Miniaturas locales: se descargan y reducen una vez, después las sirve la ruta estática
+    images = ImageCache(MESSIER_IMAGES)
+    images.prepare()
+    return images
+
+recorder = StageRecorder(enabled=debug_enabled(st.query_params))
+with recorder.stage('catalog_load') as s:
+    df_stars, const_data, df_exo = get_catalogs()
+    s['rows'] = len(df_stars)
 
 # 3. Inicializar Estado
 if 'lat' not in st.session_state:
@@ -45,26 +154,49 @@ if 'lat' not in st.session_state:
         'show_planet':False,
         "dist_max": 500,
         "show_mess": False,
-        "show_images": False
+        "show_images": False,
+        "precise": False,        # Precesión, nutación y refracción
+        "render": "plotly"       # 'raster': estrellas y líneas como imagen de fondo
     })
 
 
 # 4. Modal de Configuración 
 @st.dialog("Configuración del Planetario", width="large")
 def show_settings():
-    t1, t2, t3, t4, t5 = st.tabs(["🔍 Buscar", "📍 GPS", "🕒 Tiempo", "🔄 Vista", "🎨 Ajustes"])
+    t1, t2, t3, t4, t5, t6 = st.tabs(["🔍 Buscar", "📍 GPS", "🕒 Tiempo", "🔄 Vista", "🎨 Ajustes", "🌙 Esta noche"])
     with t1:
-        st.session_state.sel = st.selectbox("Elegí un astro:", [""] + sorted(df_stars['proper'].dropna().tolist()))
+        query = st.text_input("Buscar astro", placeholder="Sirius, α Cen, 58 Ori, HIP 32349, Marte...")
+        results = get_search_index().search(query) if query else []
+        if results:
+            labels = dict(results)
+            # Sin opción elegida de entrada: escribir no cambia la selección hasta hacer clic
+            choice = st.radio("Resultados", list(labels), format_func=labels.get, index=None)
+            if choice is not None:
+                st.session_state.sel = choice
+        elif query:
+            st.caption("Sin resultados")
         if st.button("Limpiar Trayectoria"): st.session_state.sel = None
     with t2:
+        ciudad = st.selectbox("Ciudad", list(CIUDADES), index=list(CIUDADES).index(st.session_state.ciudad_actual))
+        if ciudad != st.session_state.ciudad_actual:
+            st.session_state.ciudad_actual = ciudad
+            st.session_state.lat, st.session_state.lon = CIUDADES[ciudad][:2]
         if st.button("🛰️ Obtener ubicación GPS"):
+            from streamlit_js_eval import get_geolocation  # Solo se carga si se pide el GPS
             loc = get_geolocation()
             if loc: st.session_state.lat, st.session_state.lon = loc['coords']['latitude'], loc['coords']['longitude']
         st.session_state.lat = st.number_input("Latitud", value=st.session_state.lat, format="%.4f")
         st.session_state.lon = st.number_input("Longitud", value=st.session_state.lon, format="%.4f")
+        st.caption(f"Zona horaria: {resolve_timezone(st.session_state.lat, st.session_state.lon)}")
     with t3:
-        st.session_state.d = st.date_input("Fecha", st.session_state.d)
-        st.session_state.t = st.time_input("Hora", st.session_state.t)
+        st.session_state.live = st.toggle("🔴 En vivo (hora actual)", st.session_state.get('live', False))
+        if st.session_state.live:
+            st.session_state.live_every = st.select_slider("Actualizar cada", list(LIVE_CADENCES),
+                                                           st.session_state.get('live_every', LIVE_CADENCE),
+                                                           format_func=LIVE_CADENCES.get)
+        else:
+            st.session_state.d = st.date_input("Fecha", st.session_state.d)
+            st.session_state.t = st.time_input("Hora", st.session_state.t)
     with t4:
         st.session_state.view = st.slider("Mirar hacia (Solo Panorama)", 0, 360, st.session_state.view, step=15)
         st.session_state.fov = st.slider("Zoom / FOV", 30, 180, st.session_state.fov, step=30 )
@@ -84,106 +216,134 @@ def show_settings():
                                                         value=st.session_state.get('follow_astro', False))
             if st.session_state.follow_astro:
                 st.info(f"Orbitando alrededor de: {st.session_state.sel or 'Sol'}")            
+        else:
+            motores = {"plotly": "Interactivo (puntos)", "raster": "Imagen (rápido con muchas estrellas)",
+                       "client": "Navegador (vista y zoom sin recargar)"}
+            st.session_state.render = st.radio("Motor de dibujo", list(motores), format_func=motores.get,
+                                               index=list(motores).index(st.session_state.get('render', 'plotly')),
+                                               horizontal=True)
 
         st.session_state.show_const = st.checkbox("Ver Constelaciones", st.session_state.show_const)
         st.session_state.show_mess = st.checkbox("Ver Messiers", st.session_state.show_mess)
+        if st.session_state.show_mess:
+            st.session_state.dso_mag = st.slider("Brillo límite NGC/IC", 4.0, 10.0,
+                                                 st.session_state.get('dso_mag', 8.0), step=0.5)
         st.session_state.show_planet = st.checkbox("Ver Planetas", st.session_state.show_planet)
         st.session_state.show_images = st.checkbox("🖼️ Ver fotos reales (Nebulosas/Galaxias)", value=st.session_state.show_images)
         st.session_state.show_grid = st.checkbox("Ver Grilla", st.session_state.show_grid)
+        if st.session_state.show_grid:
+            st.session_state.grid_layers = st.multiselect("Capas de grilla", list(GRID_LAYERS),
+                                                          st.session_state.get('grid_layers', DEFAULT_GRID_LAYERS),
+                                                          format_func=lambda k: GRID_LAYERS[k][0])
+        st.session_state.precise = st.checkbox("🎯 Posiciones precisas (precesión, nutación, refracción)",
+                                               st.session_state.get('precise', False))
 
-        st.session_state.mag = st.slider("Brillo Límite", 0.0, 7.0, st.session_state.mag)
+        st.session_state.mag = st.slider("Brillo Límite", 0.0, MAG_MAX, st.session_state.mag)
         st.session_state.scale = st.slider("Escala Puntos", 1.0, 6.0, st.session_state.scale)
+    with t6:
+        # Salida / culminación / puesta de todo el catálogo (forma cerrada) + planetas
+        twilight = st.selectbox("Noche desde el crepúsculo", list(TWILIGHT_NAMES),
+                                list(TWILIGHT_NAMES).index(st.session_state.get('twilight', 'nautico')),
+                                format_func=TWILIGHT_NAMES.get)
+        st.session_state.twilight = twilight
+        tabla = get_visibility_calculator().tonight(st.session_state.lat, st.session_state.lon, st.session_state.d,
+                                                    local_tz, mag_max=st.session_state.mag, twilight=twilight)
+        if tabla.empty:
+            st.info(f"No hay noche {TWILIGHT_NAMES[twilight]} en esta fecha y lugar.")
+        else:
+            hora = st.column_config.DatetimeColumn(format="HH:mm")
+            st.dataframe(tabla, use_container_width=True, hide_index=True, height=420,
+                         column_config={c: hora for c in ('Sale', 'Culmina', 'Se pone', 'Visible desde', 'Visible hasta')})
     if st.button("APLICAR Y CERRAR", use_container_width=True): st.rerun()
 
 
+# Fecha y hora se interpretan en la zona del observador (ciudad, GPS o coordenadas a mano)
+local_tz = observer_tz(st.session_state.lat, st.session_state.lon)
+
 # Mostrar el botón antes que el mapa (el CSS se encarga de hacerlo flotar)
 if st.button("⚙️"):
     show_settings()
 
 # 5. Cálculos Astronómicos
-local_tz = pytz.timezone('America/Argentina/Buenos_Aires')
+# En vivo el reloj sigue a la hora actual: cada reconstrucción completa arranca del "ahora"
+live = st.session_state.get('live', False) and st.session_state.mode != "Mapa Galáctico 3D"
+if live:
+    now = datetime.datetime.now(local_tz)
+    st.session_state.d, st.session_state.t = now.date(), now.time().replace(microsecond=0)
 dt_utc = local_tz.localize(datetime.datetime.combine(st.session_state.d, st.session_state.t)).astimezone(pytz.utc)
 
-# A. Procesar Estrellas
-stars_df = df_stars.copy()
-stars_df['alt'], stars_df['az'] = SkyEngine.get_alt_az(
-    stars_df['ra'], stars_df['dec'], st.session_state.lat, st.session_state.lon, dt_utc
-)
-
-# Aplicar Proyección (Panorama o Cenit)
-stars_df['px'], stars_df['py'] = SkyEngine.transform(
-    stars_df['az'], stars_df['alt'], st.session_state
-)
-
-# A. Procesar Estrellas (Llamada al motor)
-visible = SkyEngine.process_stars(stars_df, st.session_state, dt_utc)
-
-# B. Procesar Planetas (Llamada al motor)
-df_planets = SkyEngine.process_planets(st.session_state, dt_utc, CON_ES)
+# A-B. Estrellas, planetas y capas (sin Streamlit, medido por etapa)
+# ?profile=1 (o =sample) perfila solo este rerun; SKY_PROFILE perfila todos
+profile_mode = profiling_requested(st.query_params)
+session_id = st.session_state.setdefault('session_id', uuid.uuid4().hex[:8])
+# Proyección en el navegador: Python no calcula px/py ni arma la figura
+client_side = st.session_state.get('render') == 'client' and st.session_state.mode != "Mapa Galáctico 3D"
+# Kernel por sesión: sin/cos(dec) del catálogo y buffers reutilizados entre reruns
+# (la época la fija build_sky_figure; acá no se toca)
+st.session_state.kernel = get_kernel(df_stars, st.session_state.get('kernel'))
+# Figura por sesión: las capas que no cambiaron se reutilizan entre reruns
+figures = st.session_state.setdefault('figure_cache', FigureCache())
+with maybe_profile(session_id, profile_mode) as prof:
+    chart_fig = None if client_side else build_sky_figure(
+        df_stars, const_data, df_exo, st.session_state, dt_utc, local_tz, recorder,
+        kernel=st.session_state.kernel, epochs=get_epoch_propagator(),
+        deep_sky=get_deep_sky() if st.session_state.show_mess else None,
+        images=get_image_cache() if st.session_state.show_images else None,
+        index=get_star_index(), figures=figures, photometry=get_photometry())
+if prof:
+    st.toast(f"Perfil guardado en {prof['path']}")
+    if 'profile' in st.query_params: del st.query_params['profile']
+# Vectores para los tics en vivo (solo figura de puntos: el modo imagen se rearma en cada tic)
+live_sky = LiveSky(figures, st.session_state, dt_utc) if live and chart_fig is not None and \
+    st.session_state.get('render') != 'raster' else None
 
 
 # app.py (Sección de CÁLCULOS y RENDER)
 
-# 1. Preparar capas especiales
-if st.session_state.mode == "Mapa Galáctico 3D":
-    chart_fig = SkyPlotter.draw_galactic_cube(stars_df, const_data, df_exo, st.session_state, SkyEngine)
+# Cielo 2D en un fragmento: en vivo se vuelve a correr solo esto cada 'live_every' segundos
+@st.fragment(run_every=st.session_state.get('live_every', LIVE_CADENCE) if live else None)
+def sky_view():
+    now_utc = datetime.datetime.now(pytz.utc) if live else dt_utc
+    if client_side:
+        # El navegador proyecta: alcanza con mandar la hora nueva y los planetas
+        with recorder.stage('process_planets'):
+            df_planets = SkyEngine.process_planets(st.session_state, now_utc, CON_ES) if st.session_state.show_planet else None
+        sel_row = get_star_index().row(st.session_state.sel)
+        clicked = sky_projection(get_catalog_asset(), st.session_state, now_utc, df_planets,
+                                 sel_id=get_star_index().ids[sel_row] if sel_row is not None else None)
+        if clicked:
+            sel = pick_star(clicked)
+            if sel is not None and sel != st.session_state.sel:
+                st.session_state.sel = sel
+                st.rerun()
+        return
+    rotated = False
+    if live and now_utc - dt_utc >= datetime.timedelta(seconds=1):
+        if live_sky is None or live_sky.due(now_utc) or not live_sky.matches(st.session_state):
+            st.rerun()   # Reconstrucción completa con la hora actual
+        # Un clic llega en este rerun con la figura del tic anterior: se resuelve antes de rotarla
+        # (después cambia la figura, y con ella el id del gráfico y su selección)
+        select_point(st.session_state.get(SKY_CHART_KEY), figures.fig, live_sky)
+        rotated = True
+        with recorder.stage('live_rotate'):
+            refresh_live_layers(figures, st.session_state, now_utc, recorder,
+                                images=get_image_cache() if st.session_state.show_images else None)
+            live_sky.advance(now_utc)
+    chart = st.plotly_chart(figures.fig, use_container_width=True, on_select="rerun", config={'displayModeBar': False},
+                            key=SKY_CHART_KEY)
+    if not rotated:
+        select_point(chart, figures.fig, live_sky)
 
-   
+if st.session_state.mode == "Mapa Galáctico 3D":
     # 2. Mostrar y capturar clic (rerun automático al seleccionar)
     event = st.plotly_chart(chart_fig, use_container_width=True, on_select="rerun", config={'displayModeBar': False})
     
-    """
-    # 3. Lógica de Viaje (Warp)
-    print('çlick 0')
-    if event and "selection" in event and event["selection"]["points"]:
-        print('çlick')
-        # El mapa ahora nos devuelve el ID numérico
-        selected_id = event["selection"]["points"][0].get("customdata")
-        
-        if selected_id:
-            # Buscamos el nombre correspondiente a ese ID en nuestro catálogo
-            match = df_stars[df_stars['id'] == selected_id]
-            if not match.empty:
-                star_name = match.iloc[0]['proper_clean']
-                st.session_state.sel = star_name # Guardamos para el arco amarillo
-                st.rerun()  
-    else:
-        print('çlick1')
-    """
+    # 3. Lógica de Viaje (Warp): la estrella elegida pasa a ser el centro del cubo
+    select_point(event, chart_fig)
 else:
-    fig = SkyPlotter.create_base_fig(st.session_state)
-    
-    if st.session_state.show_grid:
-        # Dibujamos la Eclíptica (Línea amarilla del Sol) como referencia extra
-        ex, ey = SkyEngine.get_grid_line(st.session_state.lat, st.session_state.lon, dt_utc, st.session_state, 'ecliptic')
-        fig.add_trace(go.Scatter(x=ex, y=ey, mode='lines', 
-                                line=dict(color='rgba(255, 255, 0, 0.2)', dash='dot'),
-                                name="Eclíptica", hoverinfo='skip'))
-    
-        # Dibujar Ecuador Celeste (Línea Azul)
-        #if st.session_state.equ:
-        ux, uy = SkyEngine.get_grid_line(st.session_state.lat,st.session_state.lon, dt_utc, st.session_state, 'equatorial')
-        fig.add_trace(go.Scatter(x=ux, y=uy, mode='lines', line=dict(color='rgba(100,100,255,0.2)')))
-
-    # Dibujar todo lo demás
-    SkyPlotter.draw_constellations(fig, stars_df, const_data, st.session_state)
-    SkyPlotter.draw_messier(fig, st.session_state.lat, st.session_state.lon, dt_utc, st.session_state, SkyEngine)
-    SkyPlotter.draw_exoplanets(fig, visible, df_exo, st.session_state)
-    SkyPlotter.draw_stars(fig, visible)
-    SkyPlotter.draw_planets(fig, df_planets, st.session_state)
-    SkyPlotter.draw_trajectory(fig, st.session_state, SkyEngine, stars_df, df_planets, local_tz)
-    SkyPlotter.draw_deep_sky_images(fig, st.session_state.lat, st.session_state.lon, dt_utc, st.session_state, SkyEngine)
-    chart_fig = fig
-
-
-    # 7. Renderizado Final
-    #st.markdown('<div class="floating-btn">', unsafe_allow_html=True)
-    #if st.button("⚙️"): show_settings()
-    #st.markdown('</div>', unsafe_allow_html=True)
-
-
-    chart = st.plotly_chart(chart_fig, use_container_width=True, on_select="rerun", config={'displayModeBar': False})
-    if chart and "selection" in chart and chart["selection"]["points"]:
-        st.session_state.sel = chart["selection"]["points"][0]["customdata"]; st.rerun()
+    sky_view()
+
+recorder.export()
+recorder.render_panel()
 
 # app.py
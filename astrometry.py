@@ -0,0 +1,201 @@
+# astrometry.py
+"""Posiciones aparentes: precesión (IAU 1976), nutación (términos principales de IAU 1980),
+tiempo sidéreo aparente y refracción atmosférica.
+
+Todo se resume en una matriz 3x3 por (instante, observador) que lleva vectores
+unitarios J2000 al sistema horizontal local (Norte, Este, Cenit).
+"""
+import datetime
+import threading
+from functools import lru_cache
+import numpy as np
+
+J2000 = datetime.datetime(2000, 1, 1, 12, 0, 0, tzinfo=datetime.timezone.utc)
+ARCSEC = np.pi / (180 * 3600)
+
+
+def rot_x(a):
+    c, s = np.cos(a), np.sin(a)
+    return np.array([[1, 0, 0], [0, c, s], [0, -s, c]])
+
+
+def rot_y(a):
+    c, s = np.cos(a), np.sin(a)
+    return np.array([[c, 0, -s], [0, 1, 0], [s, 0, c]])
+
+
+def rot_z(a):
+    c, s = np.cos(a), np.sin(a)
+    return np.array([[c, s, 0], [-s, c, 0], [0, 0, 1]])
+
+
+def days_since_j2000(dt_utc):
+    return (dt_utc - J2000).total_seconds() / 86400.0
+
+
+def delta_t(days):
+    """TT - UT en días (parábola de largo plazo de Morrison & Stephenson; la precesión es poco sensible)"""
+    u = (2000.0 + days / 365.25 - 1820.0) / 100.0
+    return (-20.0 + 32.0 * u * u) / 86400.0
+
+
+def mean_obliquity(t):
+    """Oblicuidad media de la eclíptica (rad), t en siglos julianos TT desde J2000"""
+    return (84381.448 - 46.8150 * t - 0.00059 * t**2 + 0.001813 * t**3) * ARCSEC
+
+
+def precession_matrix(t):
+    """Matriz de precesión J2000 -> media de la fecha (Lieske 1977)"""
+    zeta = (2306.2181 * t + 0.30188 * t**2 + 0.017998 * t**3) * ARCSEC
+    z = (2306.2181 * t + 1.09468 * t**2 + 0.018203 * t**3) * ARCSEC
+    theta = (2004.3109 * t - 0.42665 * t**2 - 0.041833 * t**3) * ARCSEC
+    return rot_z(-z) @ rot_y(theta) @ rot_z(-zeta)
+
+
+def nutation(t):
+    """(Δψ, Δε) en radianes con los cuatro términos principales (precisión ~0.5")"""
+    omega = np.radians(125.04452 - 1934.136261 * t)
+    l_sun = np.radians(280.4665 + 36000.7698 * t)
+    l_moon = np.radians(218.3165 + 481267.8813 * t)
+    dpsi = (-17.20 * np.sin(omega) - 1.32 * np.sin(2 * l_sun) - 0.23 * np.sin(2 * l_moon) + 0.21 * np.sin(2 * omega)) * ARCSEC
+    deps = (9.20 * np.cos(omega) + 0.57 * np.cos(2 * l_sun) + 0.10 * np.cos(2 * l_moon) - 0.09 * np.cos(2 * omega)) * ARCSEC
+    return dpsi, deps
+
+
+def nutation_matrix(t):
+    """Matriz media -> verdadera de la fecha"""
+    eps = mean_obliquity(t)
+    dpsi, deps = nutation(t)
+    return rot_x(-(eps + deps)) @ rot_z(-dpsi) @ rot_x(eps)
+
+
+def gast(days_ut, t_tt):
+    """Tiempo sidéreo aparente de Greenwich (rad): GMST IAU 1982 + ecuación de los equinoccios"""
+    t_ut = days_ut / 36525.0
+    gmst = (280.46061837 + 360.98564736629 * days_ut + 0.000387933 * t_ut**2 - t_ut**3 / 38710000.0) % 360
+    dpsi, _ = nutation(t_tt)
+    return np.radians(gmst) + dpsi * np.cos(mean_obliquity(t_tt))
+
+
+@lru_cache(maxsize=256)
+def _horizontal_matrix(days_ut, lat, lon):
+    t_tt = (days_ut + delta_t(days_ut)) / 36525.0
+    lst = gast(days_ut, t_tt) + np.radians(lon)
+    phi = np.radians(lat)
+    sp, cp = np.sin(phi), np.cos(phi)
+    # Ecuatorial verdadero -> (Norte, Este, Cenit)
+    to_horizon = np.array([[-sp, 0, cp], [0, 1, 0], [cp, 0, sp]]) @ rot_z(lst)
+    m = to_horizon @ nutation_matrix(t_tt) @ precession_matrix(t_tt)
+    m.setflags(write=False)  # Se comparte desde la cache
+    return m
+
+
+def horizontal_matrix(dt_utc, lat, lon):
+    """Matriz J2000 -> horizontal local. Cacheada por (segundo, lat, lon)."""
+    days = round(days_since_j2000(dt_utc) * 86400.0) / 86400.0
+    return _horizontal_matrix(days, float(lat), float(lon))
+
+
+def unit_vectors(ra_hrs, dec_deg):
+    """Vectores unitarios J2000 (n x 3, contiguos) a partir de RA (h) / Dec (°)"""
+    ra = np.radians(np.asarray(ra_hrs, dtype=np.float64) * 15)
+    dec = np.radians(np.asarray(dec_deg, dtype=np.float64))
+    cd = np.cos(dec)
+    return np.ascontiguousarray(np.column_stack((cd * np.cos(ra), cd * np.sin(ra), np.sin(dec))))
+
+
+def refraction(alt_deg):
+    """Refracción (°) para altura verdadera, fórmula de Sæmundsson (1010 hPa, 10 °C).
+
+    Bajo -1° no se aplica (el objeto ya está bajo el horizonte y la fórmula diverge).
+    """
+    h = np.maximum(alt_deg, -1.0)
+    return np.where(alt_deg >= -1.0, 1.02 / np.tan(np.radians(h + 10.3 / (h + 5.11))) / 60.0, 0.0)
+
+
+def apparent_alt_az(ra_hrs, dec_deg, lat, lon, dt_utc):
+    """alt/az aparentes (°) con precesión, nutación y refracción, para pocos objetos"""
+    hor = unit_vectors(np.atleast_1d(ra_hrs), np.atleast_1d(dec_deg)) @ horizontal_matrix(dt_utc, lat, lon).T
+    alt = np.degrees(np.arcsin(np.clip(hor[:, 2], -1, 1)))
+    az = np.degrees(np.arctan2(hor[:, 1], hor[:, 0])) % 360
+    alt = alt + refraction(alt)
+    if np.ndim(ra_hrs) == 0 and np.ndim(dec_deg) == 0:
+        return alt[0], az[0]
+    return alt, az
+
+
+# --- Movimiento propio -------------------------------------------------------
+
+MAS = ARCSEC / 1000.0
+KMS_TO_PC_YR = 1.0227121650537077e-06   # 1 km/s en pc/año
+LY_PER_PC = 3.26156
+
+
+def propagate(ra_hrs, dec_deg, dist_pc, pmra, pmdec, rv, years):
+    """Propaga posiciones J2000 'years' años con movimiento espacial lineal (vectorizado).
+
+    pmra es μα·cos(δ) en mas/año (convención Hipparcos/HYG), pmdec en mas/año y rv en km/s.
+    Valores faltantes se toman como 0. Devuelve (ra_hrs, dec_deg, dist_pc).
+    """
+    ra = np.radians(np.asarray(ra_hrs, dtype=np.float64) * 15)
+    dec = np.radians(np.asarray(dec_deg, dtype=np.float64))
+    dist_in = np.asarray(dist_pc, dtype=np.float64)
+    # Sin distancia válida se supone muy lejana: el movimiento angular se conserva igual
+    d = np.where(np.isfinite(dist_in) & (dist_in > 0), dist_in, 1e5)
+    pmra = np.nan_to_num(np.asarray(pmra, dtype=np.float64)) * MAS
+    pmdec = np.nan_to_num(np.asarray(pmdec, dtype=np.float64)) * MAS
+    rv = np.nan_to_num(np.asarray(rv, dtype=np.float64)) * KMS_TO_PC_YR
+
+    sa, ca, sd, cd = np.sin(ra), np.cos(ra), np.sin(dec), np.cos(dec)
+    # Base local: r (radial), p (hacia +RA), q (hacia +Dec)
+    r = np.stack((cd * ca, cd * sa, sd))
+    p = np.stack((-sa, ca, np.zeros_like(ra)))
+    q = np.stack((-sd * ca, -sd * sa, cd))
+    pos = r * d + (p * (pmra * d) + q * (pmdec * d) + r * rv) * years
+
+    dist = np.sqrt((pos ** 2).sum(axis=0))
+    ra_new = np.degrees(np.arctan2(pos[1], pos[0])) % 360 / 15
+    dec_new = np.degrees(np.arcsin(np.clip(pos[2] / dist, -1, 1)))
+    return ra_new, dec_new, np.where(d == dist_in, dist, dist_in)
+
+
+class EpochPropagator:
+    """Posiciones del catálogo para cualquier fecha, cacheadas por época redondeada.
+
+    Con STEP_YEARS = 0.1 el error por redondeo es < 1" hasta para la estrella de Barnard.
+    """
+    STEP_YEARS = 0.1
+    MAX_ENTRIES = 16
+
+    def __init__(self, df_stars):
+        self.ra = df_stars['ra'].to_numpy(dtype=np.float64)
+        self.dec = df_stars['dec'].to_numpy(dtype=np.float64)
+        self.dist = df_stars['dist'].to_numpy(dtype=np.float64)
+        self.pmra = df_stars['pmra'].to_numpy(dtype=np.float64)
+        self.pmdec = df_stars['pmdec'].to_numpy(dtype=np.float64)
+        self.rv = df_stars['rv'].to_numpy(dtype=np.float64)
+        self.has_motion = bool(np.isfinite(self.pmra).any() or np.isfinite(self.pmdec).any())
+        self._cache = {}
+        self._lock = threading.Lock()  # Compartido entre sesiones
+
+    def epoch_key(self, dt_utc):
+        years = days_since_j2000(dt_utc) / 365.25
+        return round(round(years / self.STEP_YEARS) * self.STEP_YEARS, 6)
+
+    def at(self, dt_utc):
+        """(ra_hrs, dec_deg, dist_ly, clave) para la fecha dada"""
+        key = self.epoch_key(dt_utc)
+        if not self.has_motion or key == 0:
+            return self.ra, self.dec, self.dist * LY_PER_PC, 0.0
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is None:
+            ra, dec, dist = propagate(self.ra, self.dec, self.dist, self.pmra, self.pmdec, self.rv, key)
+            cached = (ra, dec, dist * LY_PER_PC)
+            for a in cached:
+                a.setflags(write=False)
+            with self._lock:
+                if len(self._cache) >= self.MAX_ENTRIES:
+                    self._cache.pop(next(iter(self._cache)))
+                self._cache[key] = cached
+        return cached + (key,)
@@ -0,0 +1,199 @@
+# benchmarks/hot_paths.py
+"""Benchmark del motor y del dibujo sobre un catálogo sintético (sin red).
+
+Uso: python benchmarks/hot_paths.py [--stars N] [--repeat N] [--json salida.json]
+Reporta tiempo (mediana), pico de memoria (tracemalloc) y tamaño del JSON de la figura.
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pytz
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalog_backend import CSVBackend  # noqa: E402
+from constants import CON_ES  # noqa: E402
+from data_manager import DataManager  # noqa: E402
+from engine import SkyEngine, SkyKernel  # noqa: E402
+from astrometry import EpochPropagator  # noqa: E402
+from raster import render_sky  # noqa: E402
+from figure_cache import FigureCache  # noqa: E402
+from pipeline import build_sky_figure, refresh_live_layers  # noqa: E402
+from live import LiveSky  # noqa: E402
+from photometry import StarPhotometry  # noqa: E402
+from sky_plotter import SkyPlotter  # noqa: E402
+from visibility import VisibilityCalculator  # noqa: E402
+from star_index import StarIndex  # noqa: E402
+from search_index import SearchIndex  # noqa: E402
+from synthetic import make_catalog, make_constellations, make_exoplanets  # noqa: E402
+
+MAGS = [3.2, 5.0, 7.0]
+DIST_MAX = [50, 500, 5000]
+DT_UTC = datetime.datetime(2025, 6, 21, 2, 0, tzinfo=pytz.utc)
+
+
+def make_config(mag=5.0, mode='Panorama', dist_max=500, sel=None):
+    return {'lat': -34.9214, 'lon': -57.9546, 'view': 0, 'fov': 100, 'mag': mag, 'scale': 1.0,
+            'show_const': True, 'show_grid': True, 'mode': mode, 'd': DT_UTC.date(),
+            't': DT_UTC.time(), 'sel': sel, 'show_planet': True, 'dist_max': dist_max,
+            'show_mess': True, 'show_images': True}
+
+
+def run(fn, repeat):
+    """Corre fn 'repeat' veces: mediana de tiempo, pico de memoria y el último resultado"""
+    times = []
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            result = fn()
+            times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak, result
+
+
+def payload(fig):
+    return len(fig.to_json().encode()) if fig is not None else None
+
+
+def bench_all(n_stars, repeat):
+    results = []
+
+    def record(name, params, fn, fig_of=None):
+        sec, peak, res = run(fn, repeat)
+        fig = fig_of(res) if fig_of else None
+        results.append({'bench': name, 'params': params, 'ms': sec * 1000,
+                        'peak_mb': peak / 2**20, 'payload_kb': payload(fig) / 1024 if fig else None})
+        return res
+
+    # El CSV sintético solo hace falta para la carga; el directorio se borra al salir
+    with tempfile.TemporaryDirectory(prefix='sky_bench_') as tmp:
+        backend = CSVBackend(make_catalog(os.path.join(tmp, 'stars.csv'), n_stars))
+        for mag in MAGS:
+            record('DataManager.load_stars', f"mag_max={mag}",
+                   lambda: DataManager.load_stars(CON_ES, mag_max=mag, backend=backend))
+
+        df_all = DataManager.load_stars(CON_ES, backend=backend)
+    const = make_constellations(df_all)
+    exo = make_exoplanets(df_all)
+    cfg = make_config()
+
+    stars = df_all.copy()
+    alt, az = record('SkyEngine.get_alt_az', f"n={len(stars)}",
+                     lambda: SkyEngine.get_alt_az(stars['ra'], stars['dec'], cfg['lat'], cfg['lon'], DT_UTC))
+    stars['alt'], stars['az'] = alt, az
+    kernel = SkyKernel(stars['ra'], stars['dec'])
+    for years in (25, 5000):
+        when = DT_UTC + datetime.timedelta(days=365.25 * years)
+        # Propagador nuevo en cada corrida: se mide el cálculo, no el acierto de cache
+        record('EpochPropagator.at', f"+{years} años", lambda: EpochPropagator(stars).at(when))
+    for mode in ('Panorama', 'Cenit (Circular)'):
+        record('SkyKernel.compute', mode, lambda: kernel.compute(cfg['lat'], cfg['lon'], DT_UTC, make_config(mode=mode)))
+    for mode in ('Panorama', 'Cenit (Circular)'):
+        record('SkyEngine.transform', mode, lambda: SkyEngine.transform(stars['az'], stars['alt'], make_config(mode=mode)))
+    stars['px'], stars['py'] = SkyEngine.transform(stars['az'], stars['alt'], cfg)
+
+    record('StarPhotometry', f"n={len(stars)}", lambda: StarPhotometry(stars))
+    photometry = StarPhotometry(stars)
+    for mag in MAGS:
+        c = make_config(mag=mag)
+        record('SkyEngine.process_stars', f"mag={mag} sin photometry",
+               lambda: SkyEngine.process_stars(stars, c, DT_UTC))
+        visible = record('SkyEngine.process_stars', f"mag={mag}",
+                         lambda: SkyEngine.process_stars(stars, c, DT_UTC, photometry))
+        record('SkyPlotter.draw_stars', f"mag={mag} n={len(visible)}",
+               lambda: _draw(c, lambda f: SkyPlotter.draw_stars(f, visible)), fig_of=lambda f: f)
+        record('raster.render_sky', f"mag={mag} n={len(visible)}",
+               lambda: _draw(c, lambda f: render_sky(stars, visible, [], c, DT_UTC, SkyEngine).add_to_figure(f)),
+               fig_of=lambda f: f)
+
+    record('SkyEngine.process_planets', "", lambda: SkyEngine.process_planets(cfg, DT_UTC, CON_ES))
+    tz = pytz.timezone('America/Argentina/Buenos_Aires')
+    for mag in (4.0, 7.0):
+        # Calculadora nueva en cada corrida: se mide el cálculo, no la cache por noche
+        record('VisibilityCalculator.tonight', f"mag={mag}",
+               lambda: VisibilityCalculator(stars).tonight(cfg['lat'], cfg['lon'], cfg['d'], tz, mag_max=mag))
+    for kind in ('ecliptic', 'equatorial', 'radec', 'galactic', 'altaz'):
+        record('SkyEngine.get_grid_line', kind, lambda: SkyEngine.get_grid_line(cfg['lat'], cfg['lon'], DT_UTC, cfg, kind))
+
+    record('SkyPlotter.draw_constellations', f"n={len(const)}",
+           lambda: _draw(cfg, lambda f: SkyPlotter.draw_constellations(f, stars, const, cfg)), fig_of=lambda f: f)
+
+    deep_sky = DataManager.load_deep_sky(CON_ES)
+    record('SkyPlotter.draw_messier', f"n={len(deep_sky)}",
+           lambda: _draw(cfg, lambda f: SkyPlotter.draw_messier(f, cfg['lat'], cfg['lon'], DT_UTC, cfg, SkyEngine, deep_sky)),
+           fig_of=lambda f: f)
+
+    figures = FigureCache()
+    build_sky_figure(df_all, const, exo, cfg, DT_UTC, pytz.utc, figures=figures)
+    record('build_sky_figure', "rerun sin cambios (FigureCache)",
+           lambda: build_sky_figure(df_all, const, exo, cfg, DT_UTC, pytz.utc, figures=figures), fig_of=lambda f: f)
+    record('build_sky_figure', "rerun sin cambios (figura nueva)",
+           lambda: build_sky_figure(df_all, const, exo, cfg, DT_UTC, pytz.utc), fig_of=lambda f: f)
+    live = LiveSky(figures, cfg, DT_UTC)
+    tick = DT_UTC + datetime.timedelta(minutes=5)
+    record('LiveSky.advance', "+5 min", lambda: live.advance(tick))
+    record('refresh_live_layers', "+5 min", lambda: refresh_live_layers(figures, cfg, tick))
+
+    index = record('StarIndex', f"n={len(stars)}", lambda: StarIndex(stars))
+    search = record('SearchIndex', f"n={len(stars)}", lambda: SearchIndex(stars))
+    for q in ('e', 'estrella12', 'hip 104', 'alfa orion', 'estrela123'):
+        record('SearchIndex.search', repr(q), lambda: search.search(q))
+    sel = df_all.sort_values('mag').iloc[0]['proper_clean']
+    c = make_config(sel=sel)
+    for name, idx in (('scan', None), ('StarIndex', index)):
+        record('SkyPlotter.draw_trajectory', f"sel={sel} {name}",
+               lambda: _draw(c, lambda f: SkyPlotter.draw_trajectory(f, c, SkyEngine, stars, {}, pytz.utc, idx)),
+               fig_of=lambda f: f)
+    mask = (stars['alt'] > -1).to_numpy() & (stars['mag'] <= cfg['mag']).to_numpy()
+    screen = record('StarIndex.screen_index', f"n={mask.sum()}",
+                    lambda: StarIndex.screen_index(stars['px'].to_numpy(), stars['py'].to_numpy(), mask))
+    record('NearestIndex.query', "2D", lambda: screen.query((10.0, 30.0), max_dist=2.0))
+
+    for mag in MAGS:
+        for dist_max in DIST_MAX:
+            c = make_config(mag=mag, mode='Mapa Galáctico 3D', dist_max=dist_max)
+            record('SkyPlotter.draw_galactic_cube', f"mag={mag} dist_max={dist_max}",
+                   lambda: SkyPlotter.draw_galactic_cube(stars, const, exo, c, SkyEngine, index), fig_of=lambda f: f)
+    return results
+
+
+def _draw(config, layer):
+    fig = SkyPlotter.create_base_fig(config)
+    layer(fig)
+    return fig
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stars', type=int, default=120_000, help="tamaño del catálogo sintético")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help="guardar resultados en este archivo")
+    args = parser.parse_args()
+
+    results = bench_all(args.stars, args.repeat)
+    print(f"{'benchmark':<34}{'parámetros':<28}{'ms':>10}{'pico MB':>10}{'JSON KB':>10}")
+    for r in results:
+        kb = f"{r['payload_kb']:.1f}" if r['payload_kb'] is not None else '-'
+        print(f"{r['bench']:<34}{r['params']:<28}{r['ms']:>10.2f}{r['peak_mb']:>10.2f}{kb:>10}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'stars': args.stars, 'repeat': args.repeat, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/import_time.py
+"""Mide el tiempo de importación de cada módulo y qué dependencias pesadas arrastra.
+
+Uso: python benchmarks/import_time.py [--repeat N]
+Sale con código 1 si algún módulo supera su presupuesto o carga un módulo diferido.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Presupuesto en milisegundos (tiempo acumulado de 'python -X importtime')
+BUDGET_MS = {
+    'constants': 30,
+    'lazy_import': 30,
+    'engine': 250,
+    'catalog_backend': 250,
+    'downloader': 250,
+    'data_manager': 300,
+    'styles': 30,
+    'sky_plotter': 300,
+}
+
+# Módulos que importar cada archivo NO debe cargar (se cargan al usarse)
+DEFERRED = ['ephem', 'pandas', 'plotly', 'pytz', 'requests', 'streamlit', 'streamlit_js_eval', 'pyarrow']
+
+PROBE = "import sys, {mod}; print('LOADED=' + ','.join(m for m in {deferred!r} if m in sys.modules))"
+
+
+def measure(mod):
+    """Devuelve (ms acumulados, módulos diferidos que se cargaron igual)"""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE.format(mod=mod, deferred=DEFERRED)],
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+    total_us = 0
+    for line in out.stderr.splitlines():
+        m = re.match(r'import time:\s+\d+ \|\s+(\d+) \| (\S+)$', line)
+        if m and m.group(2) == mod:
+            total_us = int(m.group(1))
+    loaded = out.stdout.strip().split('LOADED=', 1)[-1]
+    return total_us / 1000.0, [m for m in loaded.split(',') if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help="corridas por módulo (se toma la mínima)")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'módulo':<18}{'ms':>9}{'límite':>9}  diferidos cargados")
+    for mod, budget in BUDGET_MS.items():
+        runs = [measure(mod) for _ in range(args.repeat)]
+        ms = min(r[0] for r in runs)
+        loaded = runs[0][1]
+        ok = ms <= budget and not loaded
+        failed |= not ok
+        print(f"{mod:<18}{ms:>9.1f}{budget:>9}  {', '.join(loaded) or '-'}{'' if ok else '  <-- FALLA'}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
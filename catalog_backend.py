@@ -0,0 +1,182 @@
+# catalog_backend.py
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import closing
+import numpy as np
+from lazy_import import lazy_module
+
+pd = lazy_module("pandas")
+
+
+class CatalogBackend(ABC):
+    """Interfaz común: cada backend resuelve los filtros en su propio motor.
+
+    Filtros soportados (todos opcionales):
+      - mag_max: solo estrellas con mag <= mag_max
+      - hip_in:  solo estrellas cuyo HIP está en el conjunto
+      - region:  (ra_min, ra_max, dec_min, dec_max) en horas/grados.
+                 Si ra_min > ra_max la región cruza las 0h.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    @abstractmethod
+    def query(self, columns, mag_max=None, hip_in=None, region=None):
+        """DataFrame con 'columns' de las filas que cumplen los filtros"""
+
+    @abstractmethod
+    def available_columns(self):
+        """Columnas que ofrece el catálogo (para pedir las opcionales solo si existen)"""
+
+    @staticmethod
+    def _mask(df, mag_max=None, hip_in=None, region=None):
+        """Máscara booleana equivalente a los filtros (para backends sin motor propio)"""
+        mask = np.ones(len(df), dtype=bool)
+        if mag_max is not None:
+            mask &= pd.to_numeric(df['mag'], errors='coerce').to_numpy() <= mag_max
+        if hip_in is not None:
+            mask &= pd.to_numeric(df['hip'], errors='coerce').isin(list(hip_in)).to_numpy()
+        if region is not None:
+            ra_min, ra_max, dec_min, dec_max = region
+            ra, dec = df['ra'].to_numpy(), df['dec'].to_numpy()
+            mask &= (dec >= dec_min) & (dec <= dec_max)
+            if ra_min <= ra_max:
+                mask &= (ra >= ra_min) & (ra <= ra_max)
+            else:
+                mask &= (ra >= ra_min) | (ra <= ra_max)
+        return mask
+
+
+class CSVBackend(CatalogBackend):
+    """CSV leído por bloques: los filtros se aplican a cada bloque antes de acumularlo"""
+    CHUNK_ROWS = 200_000
+
+    def query(self, columns, mag_max=None, hip_in=None, region=None):
+        needed = list(dict.fromkeys(list(columns) + self._filter_columns(mag_max, hip_in, region)))
+        parts = []
+        for chunk in pd.read_csv(self.path, usecols=needed, chunksize=self.CHUNK_ROWS, low_memory=False):
+            parts.append(chunk[self._mask(chunk, mag_max, hip_in, region)])
+        if not parts:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(parts, ignore_index=True)[list(columns)]
+
+    def available_columns(self):
+        return list(pd.read_csv(self.path, nrows=0).columns)
+
+    @staticmethod
+    def _filter_columns(mag_max, hip_in, region):
+        cols = []
+        if mag_max is not None: cols.append('mag')
+        if hip_in is not None: cols.append('hip')
+        if region is not None: cols.extend(['ra', 'dec'])
+        return cols
+
+
+class ParquetBackend(CatalogBackend):
+    """Parquet/Arrow: los filtros se traducen a expresiones de pyarrow.dataset"""
+
+    def _dataset(self):
+        try:
+            import pyarrow.dataset as pa_ds  # Opcional: solo para catálogos Parquet/Arrow
+        except ImportError:
+            raise ImportError("Para catálogos Parquet hace falta instalar 'pyarrow'")
+        fmt = 'ipc' if self.path.lower().endswith('.arrow') else 'parquet'
+        return pa_ds, pa_ds.dataset(self.path, format=fmt)
+
+    def available_columns(self):
+        return list(self._dataset()[1].schema.names)
+
+    def query(self, columns, mag_max=None, hip_in=None, region=None):
+        pa_ds, dataset = self._dataset()
+        expr = None
+        conds = []
+        if mag_max is not None:
+            conds.append(pa_ds.field('mag') <= mag_max)
+        if hip_in is not None:
+            conds.append(pa_ds.field('hip').cast('float64').isin([float(h) for h in hip_in]))
+        if region is not None:
+            ra_min, ra_max, dec_min, dec_max = region
+            conds.append((pa_ds.field('dec') >= dec_min) & (pa_ds.field('dec') <= dec_max))
+            if ra_min <= ra_max:
+                conds.append((pa_ds.field('ra') >= ra_min) & (pa_ds.field('ra') <= ra_max))
+            else:
+                conds.append((pa_ds.field('ra') >= ra_min) | (pa_ds.field('ra') <= ra_max))
+        for c in conds:
+            expr = c if expr is None else expr & c
+        return dataset.to_table(columns=list(columns), filter=expr).to_pandas()
+
+    @staticmethod
+    def from_csv(csv_path, parquet_path):
+        """Convierte un CSV (ej. HYG) a Parquet una sola vez"""
+        df = pd.read_csv(csv_path, low_memory=False)
+        df['hip'] = pd.to_numeric(df['hip'], errors='coerce')
+        df['mag'] = pd.to_numeric(df['mag'], errors='coerce')
+        df.to_parquet(parquet_path, index=False)
+        return ParquetBackend(parquet_path)
+
+
+class SQLiteBackend(CatalogBackend):
+    """SQLite: los filtros se resuelven con WHERE (e índices sobre mag/hip/dec)"""
+    TABLE = "stars"
+
+    def available_columns(self):
+        with closing(sqlite3.connect(self.path)) as con:
+            return [row[1] for row in con.execute(f"PRAGMA table_info({self.TABLE})")]
+
+    def query(self, columns, mag_max=None, hip_in=None, region=None):
+        where, params = [], []
+        if mag_max is not None:
+            where.append("mag <= ?"); params.append(mag_max)
+        if region is not None:
+            ra_min, ra_max, dec_min, dec_max = region
+            where.append("dec BETWEEN ? AND ?"); params.extend([dec_min, dec_max])
+            if ra_min <= ra_max:
+                where.append("ra BETWEEN ? AND ?")
+            else:
+                where.append("(ra >= ? OR ra <= ?)")
+            params.extend([ra_min, ra_max])
+
+        cols = ", ".join(f'"{c}"' for c in columns)
+        with closing(sqlite3.connect(self.path)) as con:
+            if hip_in is not None:
+                # Tabla temporal para no armar un IN (...) gigante
+                con.execute("CREATE TEMP TABLE hip_filter (hip REAL PRIMARY KEY)")
+                con.executemany("INSERT OR IGNORE INTO hip_filter VALUES (?)", [(float(h),) for h in hip_in])
+                where.append("hip IN (SELECT hip FROM hip_filter)")
+            sql = f"SELECT {cols} FROM {self.TABLE}"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            return pd.read_sql_query(sql, con, params=params)
+
+    @staticmethod
+    def from_csv(csv_path, db_path):
+        """Importa un CSV a SQLite e indexa las columnas filtrables"""
+        with closing(sqlite3.connect(db_path)) as con:
+            for i, chunk in enumerate(pd.read_csv(csv_path, chunksize=CSVBackend.CHUNK_ROWS, low_memory=False)):
+                chunk['hip'] = pd.to_numeric(chunk['hip'], errors='coerce')
+                chunk['mag'] = pd.to_numeric(chunk['mag'], errors='coerce')
+                chunk.to_sql(SQLiteBackend.TABLE, con, if_exists='replace' if i == 0 else 'append', index=False)
+            for col in ('mag', 'hip', 'dec'):
+                con.execute(f"CREATE INDEX IF NOT EXISTS idx_{col} ON {SQLiteBackend.TABLE} ({col})")
+            con.commit()
+        return SQLiteBackend(db_path)
+
+
+BACKENDS = {
+    '.csv': CSVBackend, '.gz': CSVBackend,
+    '.parquet': ParquetBackend, '.pq': ParquetBackend, '.arrow': ParquetBackend,
+    '.db': SQLiteBackend, '.sqlite': SQLiteBackend, '.sqlite3': SQLiteBackend,
+}
+
+
+def get_backend(path):
+    """Elige el backend según la extensión del archivo"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in BACKENDS:
+        raise ValueError(f"Formato de catálogo no soportado: {path}")
+    return BACKENDS[ext](path)
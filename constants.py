@@ -1,6 +1,7 @@
 # constants.py
-import datetime
-import ephem
+from lazy_import import lazy_module
+
+ephem = lazy_module("ephem")
 
 # Diccionario de Ciudades (Nombre: [Lat, Lon, Timezone])
 CIUDADES = {
@@ -44,20 +45,7 @@ MESSIER_IMAGES = {
     'M51': [13.49, 47.19, "https://upload.wikimedia.org/wikipedia/commons/thumb/d/db/Messier51_sRGB.jpg/600px-Messier51_sRGB.jpg", 2]
 }
 
-# --- DICCIONARIO OBJETOS MESSIER (Cielo Profundo) ---
-MESSIER_OBJ = {
-    'M31': [0.7123, 41.269, 'Galaxia de Andrómeda'],
-    'M42': [5.5881, -5.391, 'Nebulosa de Orión'],
-    'M45': [3.7836, 24.11, 'Cúmulo de las Pléyades'],
-    'M44': [8.6667, 19.67, 'Cúmulo del Pesebre'],
-    'M13': [16.695, 36.46, 'Gran Cúmulo de Hércules'],
-    'M8': [18.06, -24.38, 'Nebulosa de la Laguna'],
-    'M20': [18.04, -23.03, 'Nebulosa Trífida'],
-    'M51': [13.498, 47.19, 'Galaxia Remolino'],
-    'M104': [12.66, -11.62, 'Galaxia del Sombrero'],
-    'M7': [17.89, -34.82, 'Cúmulo de Ptolomeo (Escorpio)'],
-    'M6': [17.67, -32.22, 'Cúmulo de la Mariposa']
-}
+# Objetos de cielo profundo (Messier completo + NGC/IC): ver deep_sky.csv / DataManager.load_deep_sky
 
 # Estilos de color para la escala espectral (O, B, A, F, G, K, M)
 SPECTRAL_ANCHORS = {
@@ -66,6 +54,20 @@ SPECTRAL_ANCHORS = {
     'M': (255, 90, 90),   'Z': (255, 50, 50) 
 }
 
-PLANETS = {'Sol':ephem.Sun(), 'Luna':ephem.Moon(), 'Mercurio':ephem.Mercury(), 'Venus':ephem.Venus(), 
-                  'Marte':ephem.Mars(), 'Júpiter':ephem.Jupiter(), 'Saturno':ephem.Saturn(), 
-                  'Urano':ephem.Uranus(), 'Neptuno':ephem.Neptune()}
+# Mismo orden que PLANETS, sin cargar ephem (buscador)
+PLANET_NAMES = ['Sol', 'Luna', 'Mercurio', 'Venus', 'Marte', 'Júpiter', 'Saturno', 'Urano', 'Neptuno']
+
+def new_planets():
+    # Cuerpos ephem nuevos: compute() los modifica, así que cada cálculo usa los suyos
+    return {'Sol':ephem.Sun(), 'Luna':ephem.Moon(), 'Mercurio':ephem.Mercury(), 'Venus':ephem.Venus(), 
+            'Marte':ephem.Mars(), 'Júpiter':ephem.Jupiter(), 'Saturno':ephem.Saturn(), 
+            'Urano':ephem.Uranus(), 'Neptuno':ephem.Neptune()}
+
+
+def __getattr__(name):
+    # PLANETS se crea al primer acceso: así importar constants no carga ephem.
+    # Es compartido: para calcular posiciones usar new_planets()
+    if name == 'PLANETS':
+        globals()['PLANETS'] = new_planets()
+        return globals()['PLANETS']
+    raise AttributeError(f"module 'constants' has no attribute '{name}'")
@@ -1,10 +1,17 @@
 # data_manager.py
-import pandas as pd
 import os
-import requests
-import streamlit as st
+import hashlib
+import multiprocessing
 import numpy as np
 import re 
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from catalog_backend import CSVBackend, get_backend
+from downloader import Downloader
+from lazy_import import lazy_module
+
+pd = lazy_module("pandas")
+st = lazy_module("streamlit")
 
 class DataManager:
     STARS_URL = "https://raw.githubusercontent.com/astronexus/HYG-Database/main/hyg/CURRENT/hygdata_v41.csv"
@@ -13,16 +20,48 @@ class DataManager:
     CONST_FILE = "constellationship.fab"
     EXO_URL = "https://exoplanetarchive.ipac.caltech.edu/TAP/sync?query=select+pl_name,hostname,hip_name,sy_pnum+from+ps+where+default_flag=1&format=csv"
     EXO_FILE = "exoplanets.csv"
+    # Messier + Caldwell + NGC/IC brillantes (OpenNGC, CC-BY-SA 4.0): viene con el repo, junto a este módulo
+    DEEP_SKY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "deep_sky.csv")
+    # Catálogo local alternativo (CSV, Parquet/Arrow o SQLite). Si no se define se usa HYG.
+    CATALOG_ENV = "SKY_CATALOG"
+    STAR_COLUMNS = ['id', 'hip', 'proper', 'ra', 'dec', 'mag', 'ci', 'con', 'dist', 'spect']
+    # Se cargan si el catálogo las tiene (HYG sí): movimiento propio (mas/año), velocidad radial (km/s)
+    # y designaciones de Bayer ('Alp') / Flamsteed (58) para el buscador
+    OPTIONAL_COLUMNS = ['pmra', 'pmdec', 'rv', 'bayer', 'flam']
+    downloader = Downloader()
+
+    @staticmethod
+    def download_all(revalidate=False):
+        """Descarga en paralelo las tres fuentes que falten (o las revalida con ETag)"""
+        jobs = [(DataManager.CONST_URL, DataManager.CONST_FILE), (DataManager.EXO_URL, DataManager.EXO_FILE)]
+        if not os.environ.get(DataManager.CATALOG_ENV):
+            jobs.append((DataManager.STARS_URL, DataManager.STARS_FILE))
+        return DataManager.downloader.fetch_all(jobs, revalidate=revalidate)
+
+    @staticmethod
+    def get_star_backend():
+        """Backend del catálogo de estrellas (HYG por defecto, descargado si falta)"""
+        path = os.environ.get(DataManager.CATALOG_ENV)
+        if path:
+            return get_backend(path)
+        DataManager.downloader.fetch(DataManager.STARS_URL, DataManager.STARS_FILE)
+        return CSVBackend(DataManager.STARS_FILE)
 
     @staticmethod
-    def load_stars(con_es_dict):
-        """Descarga y limpia el catálogo HYG v41"""
-        if not os.path.exists(DataManager.STARS_FILE):
-            r = requests.get(DataManager.STARS_URL)
-            open(DataManager.STARS_FILE, 'wb').write(r.content)
+    def load_stars(con_es_dict, mag_max=None, hip_in=None, region=None, backend=None):
+        """Descarga y limpia el catálogo HYG v41.
+
+        Los filtros (mag_max, hip_in, region) se resuelven en el backend, así un
+        catálogo grande no se carga entero en memoria.
+        """
+        backend = backend or DataManager.get_star_backend()
         
-        # Cargar columnas necesarias
-        df = pd.read_csv(DataManager.STARS_FILE, usecols=['id', 'hip', 'proper', 'ra', 'dec', 'mag', 'ci', 'con', 'dist', 'spect'])
+        # Cargar columnas necesarias (+ las opcionales disponibles)
+        available = set(backend.available_columns())
+        columns = DataManager.STAR_COLUMNS + [c for c in DataManager.OPTIONAL_COLUMNS if c in available]
+        df = backend.query(columns, mag_max=mag_max, hip_in=hip_in, region=region)
+        for c in DataManager.OPTIONAL_COLUMNS:
+            if c not in df.columns: df[c] = np.nan
 
 
         df['mag'] = pd.to_numeric(df['mag'], errors='coerce')
@@ -32,6 +71,8 @@ class DataManager:
         
         # 3. Creamos el ranking real
         # 'min' asegura que si dos estrellas brillan igual, compartan puesto (ej: 1, 2, 2, 4)
+        # Con mag_max el ranking sigue siendo el real (todas las más brillantes están incluidas);
+        # con hip_in o region es el puesto dentro de ese subconjunto
         df['rank_brillo'] = df['mag'].rank(method='min', ascending=True).astype(int)
 
         df = df[df['id'] != 0] # Sin Sol
@@ -39,29 +80,84 @@ class DataManager:
 
 
         # Limpieza profunda de todas las columnas de texto
-        df['proper_clean'] = df['proper'].fillna("HIP" + df['id'].astype(str)).apply(DataManager.deep_clean)
-        df['spect'] = df['spect'].fillna('?').apply(DataManager.deep_clean)
-        df['con_es'] = df['con'].map(con_es_dict).fillna(df['con']).apply(DataManager.deep_clean)
+        df['proper_clean'] = DataManager.clean_column(df['proper'].fillna("HIP" + df['id'].astype(str)))
+        df['spect'] = DataManager.clean_column(df['spect'].fillna('?'))
+        df['con_es'] = DataManager.clean_column(df['con'].map(con_es_dict).fillna(df['con']))
 
         
         df['dist_ly'] = df['dist'] * 3.26156
         df['hip'] = pd.to_numeric(df['hip'], errors='coerce')
         # Columna de cruce para exoplanetas (Texto limpio)
-        df['hostname_match'] = df['proper'].str.strip().str.upper().apply(DataManager.deep_clean)
+        df['hostname_match'] = DataManager.clean_column(df['proper'].str.strip().str.upper())
+        DataManager.catalog_version(df)
 
         return df
 
+    @staticmethod
+    def catalog_version(df):
+        """Identidad del catálogo (hash de id/ra/dec) guardada en df.attrs.
+
+        Sobrevive a las copias de st.cache_data y a assign(), así el kernel y las capas
+        de la figura reconocen el mismo catálogo aunque el DataFrame sea otro objeto.
+        """
+        version = df.attrs.get('catalog_version')
+        if version is None:
+            h = hashlib.sha1()
+            for c in ('id', 'ra', 'dec'):
+                h.update(np.ascontiguousarray(df[c].to_numpy(dtype=np.float64)).tobytes())
+            version = df.attrs['catalog_version'] = f"{len(df)}-{h.hexdigest()[:12]}"
+        return version
+
+    @staticmethod
+    def load_all(con_es_dict, mag_max=None, workers=None):
+        """Prepara estrellas, constelaciones y exoplanetas en paralelo.
+
+        Los exoplanetas se procesan en el hilo actual (usa st.error) mientras
+        estrellas y constelaciones corren en el pool.
+        """
+        with ThreadPoolExecutor(max_workers=workers or 2) as pool:
+            f_stars = pool.submit(DataManager.load_stars, con_es_dict, mag_max=mag_max)
+            f_const = pool.submit(DataManager.load_constellations, con_es_dict)
+            exo = DataManager.load_exoplanets()
+            return f_stars.result(), f_const.result(), exo
+
+    # A partir de cuántos valores distintos conviene repartir la limpieza entre procesos
+    # (cada proceso 'spawn' tarda ~1 s en arrancar: solo compensa en catálogos enormes)
+    PARALLEL_CLEAN_MIN = 500_000
+
+    @staticmethod
+    def clean_column(series, workers=None):
+        """deep_clean vectorizado: limpia cada valor distinto una sola vez.
+
+        Con muchos valores distintos (catálogos grandes) los reparte entre núcleos.
+        """
+        codes, uniques = pd.factorize(series)
+        values = list(uniques)
+        n = workers or os.cpu_count() or 1
+        if len(values) >= DataManager.PARALLEL_CLEAN_MIN and n > 1:
+            size = -(-len(values) // n)
+            chunks = [values[i:i + size] for i in range(0, len(values), size)]
+            try:
+                # 'spawn': se llama desde hilos (load_all, servidor de Streamlit) y fork con hilos puede trabarse
+                with ProcessPoolExecutor(max_workers=n, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    cleaned = [c for part in pool.map(_clean_chunk, chunks) for c in part]
+            except (OSError, BrokenProcessPool):  # No se pudo levantar el pool: en serie
+                cleaned = _clean_chunk(values)
+        else:
+            cleaned = _clean_chunk(values)
+        # El código -1 (NaN) cae en el último elemento: ""
+        lookup = np.array(cleaned + [""], dtype=object)
+        return pd.Series(lookup[codes], index=series.index)
+
 
     @staticmethod
     def load_exoplanets():
         """Descarga y limpia la base de datos de exoplanetas de la NASA"""
         
-        if not os.path.exists(DataManager.EXO_FILE):
-            try:
-                r = requests.get(DataManager.EXO_URL)
-                open(DataManager.EXO_FILE, 'wb').write(r.content)
-            except: 
-                
+        try:
+            DataManager.downloader.fetch(DataManager.EXO_URL, DataManager.EXO_FILE)
+        except Exception:
+            if not os.path.exists(DataManager.EXO_FILE):
                 return pd.DataFrame()
 
         try:
@@ -96,12 +192,25 @@ class DataManager:
         
 
 
+    @staticmethod
+    def load_deep_sky(con_es_dict):
+        """Catálogo local de cielo profundo con el tooltip ya armado (una fila por objeto)"""
+        df = pd.read_csv(DataManager.DEEP_SKY_FILE, dtype={'code': str, 'desig': str, 'nombre': str})
+        df['is_messier'] = df['messier'].notna()
+        df['con_es'] = df['con'].map(con_es_dict).fillna(df['con']).fillna('')
+        nombre = df['nombre'].fillna('')
+        desig = np.where(df['desig'] != df['code'], " (" + df['desig'] + ")", "")
+        df['label'] = np.where(nombre != '', nombre, df['type_es'])
+        df['hover'] = ("<b>" + df['code'] + desig + "</b><br>" + df['label'] + "<br>" +
+                       "Tipo: " + df['type_es'] + "<br>" + "Const: " + df['con_es'] + "<br>" +
+                       "Mag: " + df['mag'].map(lambda m: '?' if pd.isna(m) else f"{m:.1f}") +
+                       df['size'].map(lambda s: '' if pd.isna(s) else f"<br>Tamaño: {s:.0f}'"))
+        return df
+
     @staticmethod
     def load_constellations(con_es_dict):
         """Descarga y parsea las líneas de Stellarium"""
-        if not os.path.exists(DataManager.CONST_FILE):
-            r = requests.get(DataManager.CONST_URL)
-            open(DataManager.CONST_FILE, 'wb').write(r.content)
+        DataManager.downloader.fetch(DataManager.CONST_URL, DataManager.CONST_FILE)
             
         const_data = []
         with open(DataManager.CONST_FILE, 'r') as f:
@@ -125,4 +234,9 @@ class DataManager:
         t = "".join(c for c in t if c.isprintable())
         # 3. Solo permitir letras, números y puntuación mínima
         t = re.sub(r'[^a-zA-Z0-9\s\.\,\-\(\)\/\:]', '', t)
-        return t.strip()
\ No newline at end of file
+        return t.strip()
+
+
+def _clean_chunk(values):
+    """Worker de clean_column (nivel de módulo para poder enviarlo a otro proceso)"""
+    return [DataManager.deep_clean(v) for v in values]
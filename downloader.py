@@ -0,0 +1,211 @@
+# downloader.py
+import os
+import json
+import time
+import email.utils
+from concurrent.futures import ThreadPoolExecutor
+from lazy_import import lazy_module
+
+requests = lazy_module("requests")
+
+try:
+    import fcntl
+except ImportError:  # Windows: se usa el lock por archivo exclusivo
+    fcntl = None
+
+
+class FileLock:
+    """Lock entre procesos basado en un archivo '<destino>.lock'"""
+
+    def __init__(self, path, timeout=300, poll=0.1):
+        self.path = path + ".lock"
+        self.timeout = timeout
+        self.poll = poll
+        self._fd = None
+
+    def acquire(self):
+        start = time.monotonic()
+        if fcntl is not None:
+            self._fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+            while True:
+                try:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return
+                except BlockingIOError:
+                    if time.monotonic() - start > self.timeout:
+                        os.close(self._fd); self._fd = None
+                        raise TimeoutError(f"No se pudo tomar el lock {self.path}")
+                    time.sleep(self.poll)
+        while True:
+            try:
+                self._fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_RDWR)
+                return
+            except FileExistsError:
+                # Un lock más viejo que el timeout se considera abandonado
+                try:
+                    if time.time() - os.path.getmtime(self.path) > self.timeout:
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    pass
+                if time.monotonic() - start > self.timeout:
+                    raise TimeoutError(f"No se pudo tomar el lock {self.path}")
+                time.sleep(self.poll)
+
+    def release(self):
+        if self._fd is None: return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        else:
+            os.close(self._fd)
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+        self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class Downloader:
+    """Descargas en streaming a un '.part' con rename atómico, reanudación y revalidación HTTP.
+
+    - Otro proceso nunca ve un archivo a medio escribir: el destino solo aparece vía os.replace.
+    - Los metadatos (ETag / Last-Modified) se guardan en '<destino>.meta.json'.
+    - Si quedó un '.part' de un intento anterior se pide solo el resto (Range + If-Range con
+      los validadores de esa respuesta, guardados en '<destino>.part.json'). Sin validador el
+      '.part' se descarta: el archivo remoto pudo cambiar y se mezclarían dos versiones.
+    """
+    CHUNK = 1 << 16
+
+    def __init__(self, session=None, timeout=60):
+        self._session = session
+        self.timeout = timeout
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = requests.Session()
+        return self._session
+
+    @staticmethod
+    def _meta_path(dest):
+        return dest + ".meta.json"
+
+    @staticmethod
+    def _read_json(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_json(path, resp):
+        meta = {k: resp.headers[h] for k, h in (('etag', 'ETag'), ('last_modified', 'Last-Modified')) if h in resp.headers}
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def _read_meta(cls, dest):
+        return cls._read_json(cls._meta_path(dest))
+
+    @classmethod
+    def _write_meta(cls, dest, resp):
+        cls._write_json(cls._meta_path(dest), resp)
+
+    @staticmethod
+    def _discard(*paths):
+        for p in paths:
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _range_start(resp):
+        """Primer byte de 'Content-Range: bytes a-b/n' (None si falta o no se entiende)"""
+        value = resp.headers.get('Content-Range', '')
+        try:
+            return int(value.split()[1].split('-')[0])
+        except (IndexError, ValueError):
+            return None
+
+    def fetch(self, url, dest, revalidate=False):
+        """Asegura que 'dest' exista. Devuelve True si el archivo se (re)descargó."""
+        if os.path.exists(dest) and not revalidate:
+            return False
+        with FileLock(dest):
+            # Otro worker pudo haberlo descargado mientras esperábamos el lock
+            if os.path.exists(dest) and not revalidate:
+                return False
+            return self._download(url, dest)
+
+    def _download(self, url, dest, allow_resume=True):
+        headers = {}
+        meta = self._read_meta(dest)
+        if os.path.exists(dest):
+            if 'etag' in meta: headers['If-None-Match'] = meta['etag']
+            if 'last_modified' in meta:
+                headers['If-Modified-Since'] = meta['last_modified']
+            elif 'etag' not in meta:
+                headers['If-Modified-Since'] = email.utils.formatdate(os.path.getmtime(dest), usegmt=True)
+
+        part, part_meta = dest + ".part", dest + ".part.json"
+        offset = os.path.getsize(part) if allow_resume and os.path.exists(part) else 0
+        if offset:
+            # Validador de la respuesta que escribió el '.part' (no del destino, que es otra versión)
+            validator = self._read_json(part_meta)
+            validator = validator.get('etag') or validator.get('last_modified')
+            if validator:
+                headers['Range'] = f"bytes={offset}-"
+                headers['If-Range'] = validator
+            else:
+                offset = 0
+
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as resp:
+            if resp.status_code == 304:
+                return False
+            if resp.status_code == 416 or (resp.status_code == 206 and self._range_start(resp) != offset):
+                # El '.part' no sirve (o el servidor mandó otro tramo): empezamos de cero
+                self._discard(part, part_meta)
+                return self._download(url, dest, allow_resume=False)
+            resp.raise_for_status()
+
+            if resp.status_code == 206:
+                mode = 'ab'
+            else:
+                mode = 'wb'
+                self._write_json(part_meta, resp)
+            with open(part, mode) as f:
+                for chunk in resp.iter_content(self.CHUNK):
+                    if chunk: f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(part, dest)
+            self._write_meta(dest, resp)
+            self._discard(part_meta)
+        return True
+
+    def fetch_all(self, jobs, revalidate=False, max_workers=None):
+        """Descarga en paralelo una lista de (url, destino).
+
+        Devuelve {destino: True/False/Exception}; un fallo no cancela al resto.
+        """
+        def run(job):
+            url, dest = job
+            try:
+                return dest, self.fetch(url, dest, revalidate)
+            except Exception as e:
+                return dest, e
+
+        with ThreadPoolExecutor(max_workers=max_workers or len(jobs) or 1) as pool:
+            return dict(pool.map(run, jobs))
@@ -1,9 +1,18 @@
 import numpy as np
 import datetime
-import pandas as pd
-import ephem
-import pytz
+import logging
+from collections import OrderedDict
 from constants import SPECTRAL_ANCHORS
+from lazy_import import lazy_module
+import astrometry
+from photometry import StarPhotometry
+
+# Módulos pesados: se importan recién cuando un modo los necesita
+pd = lazy_module("pandas")
+ephem = lazy_module("ephem")
+pytz = lazy_module("pytz")
+
+logger = logging.getLogger(__name__)
 
 
 class SkyEngine:
@@ -15,11 +24,18 @@ class SkyEngine:
         return local_dt.astimezone(pytz.utc)
 
     @staticmethod
-    def get_alt_az(ra_hrs, dec_deg, lat, lon, dt_utc):
-        """Matemática de posición astronómica"""
-        lat_r, lon_r = np.radians(lat), np.radians(lon)
+    def get_lst(lon, dt_utc):
+        """Tiempo sidéreo local en radianes (GMST lineal desde J2000)"""
         d = (dt_utc - datetime.datetime(2000, 1, 1, 12, 0, 0, tzinfo=datetime.timezone.utc)).total_seconds() / 86400.0
-        lst = np.radians((280.46061837 + 360.98564736629 * d) % 360 + lon)
+        return np.radians((280.46061837 + 360.98564736629 * d) % 360 + lon)
+
+    @staticmethod
+    def get_alt_az(ra_hrs, dec_deg, lat, lon, dt_utc, precise=False):
+        """Matemática de posición astronómica (precise: precesión, nutación y refracción)"""
+        if precise:
+            return astrometry.apparent_alt_az(ra_hrs, dec_deg, lat, lon, dt_utc)
+        lat_r, lon_r = np.radians(lat), np.radians(lon)
+        lst = SkyEngine.get_lst(lon, dt_utc)
         ra_r, dec_r = np.radians(ra_hrs * 15), np.radians(dec_deg)
         ha = lst - ra_r
         alt = np.arcsin(np.clip(np.sin(dec_r)*np.sin(lat_r) + np.cos(dec_r)*np.cos(lat_r)*np.cos(ha), -1, 1))
@@ -87,18 +103,35 @@ class SkyEngine:
         
 
     @classmethod
-    def process_stars(cls, df, config, dt_utc):
-        """Punto 5A refactorizado: Filtra y procesa el catálogo de estrellas"""
+    def process_stars(cls, df, config, dt_utc, photometry=None, rows=None):
+        """Punto 5A refactorizado: Filtra y procesa el catálogo de estrellas.
+
+        'photometry' (StarPhotometry del mismo catálogo) trae colores y tamaños ya
+        calculados: acá solo se indexan con la máscara de visibles. Si 'df' es un
+        subconjunto del catálogo, 'rows' son sus posiciones en él.
+        """
         """
         df_stars = df.copy()
         df_stars['alt'], df_stars['az'] = cls.get_alt_az(df_stars['ra'], df_stars['dec'], config['lat'], config['lon'], dt_utc)
         df_stars['px'], df_stars['py'] = cls.transform(df_stars['az'], df_stars['alt'], config)
         """
         
-        visible = df[(df['alt'] > -1) & (df['mag'] <= config['mag'])].copy()
-        visible['color'] = visible['spect'].map(cls.get_spectral_color)
-        visible['size'] = (config['mag'] - visible['mag']) * 0.3 + config['scale']
-        print(visible)
+        mask = (df['alt'].to_numpy() > -1) & (df['mag'].to_numpy() <= config['mag'])
+        visible = df[mask].copy()
+        if rows is None:
+            rows = mask
+            if photometry is not None and photometry.n != len(df):
+                photometry = None
+        else:
+            rows = np.asarray(rows)[mask]
+        if photometry is None:
+            # Sin modelo del catálogo: se arma solo para las visibles
+            photometry, rows = StarPhotometry(visible), slice(None)
+        size, opacity = photometry.sizes(config['mag'], config['scale'])
+        visible['color'] = photometry.color[rows]
+        visible['size'] = size[rows]
+        visible['opacity'] = opacity[rows]
+        logger.debug("process_stars: %d estrellas visibles de %d", len(visible), len(df))
         return visible
 
     @classmethod
@@ -157,25 +190,9 @@ class SkyEngine:
 
     @classmethod
     def get_grid_line(cls, lat, lon, dt_utc, config, type='ecliptic'):
-        """Genera puntos para la Eclíptica o el Ecuador Celeste"""
-        ra_points = np.linspace(0, 24, 100)
-        if type == 'ecliptic':
-            # La eclíptica está inclinada 23.44° respecto al ecuador
-            dec_points = 23.44 * np.sin(np.radians(ra_points * 15))
-        else: # equatorial
-            dec_points = np.zeros(100)
-            
-        alt, az = cls.get_alt_az(ra_points, dec_points, lat, lon, dt_utc)
-        
-        # Transformar según el modo
-        px, py = [], []
-        for a, z in zip(alt, az):
-            if a > -5: # Solo mostrar si está cerca del horizonte
-                x, y = cls.transform(z, a, config)
-                if px and abs(x - px[-1]) > 100 and config['mode'] == "Panorama":
-                    px.append(None); py.append(None)
-                px.append(x); py.append(y)
-        return px, py
+        """Puntos (px, py) de una capa de grilla; NaN corta la línea (ver grid.py)"""
+        import grid  # grid usa SkyEngine: import diferido para evitar el ciclo
+        return grid.grid_line('equator' if type == 'equatorial' else type, lat, lon, dt_utc, config)
 
 
     @staticmethod
@@ -189,15 +206,22 @@ class SkyEngine:
         return x, y, z
 
     @classmethod
-    def get_translated_universe(cls, df_stars, target_name):
-        """Mueve todo el universo para que la estrella elegida sea el centro (0,0,0)"""
+    def get_translated_universe(cls, df_stars, target_name, index=None):
+        """Mueve todo el universo para que la estrella elegida sea el centro (0,0,0)
+
+        Con 'index' (StarIndex) la estrella se resuelve en O(1) en vez de filtrar el catálogo.
+        """
         df = df_stars.copy()
         # 1. Calcular coordenadas absolutas
         df['x_abs'], df['y_abs'], df['z_abs'] = cls.get_galactic_3d(df['ra'], df['dec'], df['dist_ly'])
         
         # 2. Encontrar el centro (Sol por defecto)
         cx, cy, cz = 0, 0, 0
-        if target_name:
+        if target_name and index is not None:
+            row = index.row(target_name)
+            if row is not None:
+                cx, cy, cz = (df[c].iat[row] for c in ('x_abs', 'y_abs', 'z_abs'))
+        elif target_name:
             target = df[df['proper_clean'] == target_name]
             if not target.empty:
                 cx, cy, cz = target.iloc[0]['x_abs'], target.iloc[0]['y_abs'], target.iloc[0]['z_abs']
@@ -239,4 +263,118 @@ class SkyEngine:
         
         return x, y, z    
     
-    
\ No newline at end of file
+    
+
+
+
+class SkyKernel:
+    """Kernel fusionado ecuatorial -> horizontal -> pantalla para todo el catálogo.
+
+    sin/cos(dec) y RA en radianes se calculan una sola vez por estrella; cada
+    llamada a compute() reutiliza los mismos buffers (no crea temporales).
+    Los arrays devueltos se sobreescriben en la próxima llamada: copiarlos si
+    se quieren conservar. Una instancia por sesión (los buffers no son thread-safe).
+
+    Con config['precise'] se usan posiciones aparentes: una matriz 3x3 por
+    (instante, observador) aplicada a los vectores unitarios J2000 del catálogo.
+    """
+
+    EPOCHS_KEPT = 4   # Épocas con sin/cos(dec) guardados (volver a una fecha anterior no recalcula)
+
+    def __init__(self, ra_hrs, dec_deg, epoch=0.0, catalog=None):
+        self.n = len(ra_hrs)
+        self.catalog = catalog   # DataManager.catalog_version del catálogo de origen
+        self._epochs = OrderedDict()   # época -> (ra, sin_dec, cos_dec)
+        self.alt, self.az, self.px, self.py = (np.empty(self.n) for _ in range(4))
+        self._s1, self._s2, self._s3 = (np.empty(self.n) for _ in range(3))
+        self._hor = None
+        self.set_positions(ra_hrs, dec_deg, epoch)
+
+    def set_positions(self, ra_hrs, dec_deg, epoch=0.0):
+        """Cambia las posiciones de catálogo (ej. otra época) conservando los buffers"""
+        cached = self._epochs.get(epoch)
+        if cached is None:
+            ra = np.radians(np.ascontiguousarray(ra_hrs, dtype=np.float64) * 15)
+            dec = np.radians(np.ascontiguousarray(dec_deg, dtype=np.float64))
+            cached = self._epochs[epoch] = (ra, np.sin(dec), np.cos(dec))
+            if len(self._epochs) > self.EPOCHS_KEPT:
+                self._epochs.popitem(last=False)
+        else:
+            self._epochs.move_to_end(epoch)
+        self.ra, self.sin_dec, self.cos_dec = cached
+        self.epoch = epoch
+        self._vec = None   # Vectores unitarios (solo modo preciso), se recalculan al usarse
+
+    def compute(self, lat, lon, dt_utc, config):
+        """Devuelve (alt, az, px, py) en grados / coordenadas de pantalla, en una pasada"""
+        if config.get('precise'):
+            return self.compute_precise(lat, lon, dt_utc, config)
+        s1, s2, s3 = self._s1, self._s2, self._s3
+        alt, az = self.alt, self.az
+        lat_r = np.radians(lat)
+        sl, cl = np.sin(lat_r), np.cos(lat_r)
+
+        np.subtract(SkyEngine.get_lst(lon, dt_utc), self.ra, out=s1)   # s1 = ángulo horario
+        np.cos(s1, out=s2)                                              # s2 = cos(ha)
+        np.sin(s1, out=s1)                                              # s1 = sin(ha)
+        np.multiply(self.cos_dec, s2, out=s3)                           # s3 = cos(dec)·cos(ha)
+
+        # sin(alt) = sin(dec)·sin(lat) + cos(dec)·cos(lat)·cos(ha)
+        np.multiply(s3, cl, out=alt)
+        np.multiply(self.sin_dec, sl, out=s2)
+        np.add(alt, s2, out=alt)
+        np.clip(alt, -1, 1, out=alt)
+        np.arcsin(alt, out=alt)
+
+        # Acimut (desde el Norte hacia el Este) con un solo arctan2:
+        # y = -cos(dec)·sin(ha), x = sin(dec)·cos(lat) - cos(dec)·sin(lat)·cos(ha)
+        np.multiply(self.sin_dec, cl, out=s2)
+        np.multiply(s3, sl, out=s3)
+        np.subtract(s2, s3, out=s2)
+        np.multiply(self.cos_dec, s1, out=s1)
+        np.negative(s1, out=s1)
+        np.arctan2(s1, s2, out=az)
+        np.mod(az, 2 * np.pi, out=az)
+
+        np.degrees(alt, out=alt)
+        np.degrees(az, out=az)
+        self.project(config)
+        return alt, az, self.px, self.py
+
+    def compute_precise(self, lat, lon, dt_utc, config):
+        """Precesión + nutación + refracción: un solo producto matricial (n x 3) @ (3 x 3)"""
+        if self._vec is None:
+            self._vec = np.empty((self.n, 3))
+            np.multiply(self.cos_dec, np.cos(self.ra), out=self._vec[:, 0])
+            np.multiply(self.cos_dec, np.sin(self.ra), out=self._vec[:, 1])
+            self._vec[:, 2] = self.sin_dec
+            self._hor = np.empty((self.n, 3))
+        np.matmul(self._vec, astrometry.horizontal_matrix(dt_utc, lat, lon).T, out=self._hor)
+
+        alt, az = self.alt, self.az
+        np.clip(self._hor[:, 2], -1, 1, out=alt)
+        np.arcsin(alt, out=alt)
+        np.arctan2(self._hor[:, 1], self._hor[:, 0], out=az)
+        np.mod(az, 2 * np.pi, out=az)
+        np.degrees(alt, out=alt)
+        np.degrees(az, out=az)
+        alt += astrometry.refraction(alt)
+        self.project(config)
+        return alt, az, self.px, self.py
+
+    def project(self, config):
+        """Proyección Panorama/Cenit sobre los buffers (misma fórmula que SkyEngine.transform)"""
+        if config['mode'] == "Panorama":
+            np.subtract(self.az, config['view'] - 180, out=self.px)
+            np.mod(self.px, 360, out=self.px)
+            np.subtract(self.px, 180, out=self.px)
+            np.copyto(self.py, self.alt)
+        else:
+            s1, s2 = self._s1, self._s2
+            np.subtract(90, self.alt, out=s1)          # r
+            np.radians(self.az, out=s2)                # theta
+            np.sin(s2, out=self.px)
+            np.cos(s2, out=self.py)
+            np.multiply(self.px, s1, out=self.px)
+            np.multiply(self.py, s1, out=self.py)
+        return self.px, self.py
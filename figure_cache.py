@@ -0,0 +1,83 @@
+# figure_cache.py
+"""Figura persistente entre reruns, armada por capas.
+
+Cada capa recuerda la clave de sus entradas y los objetos que agregó (trazas con uid
+estable e imágenes de fondo). Si la clave no cambió se reutilizan tal cual, sin volver
+a calcularlas ni a validarlas en Plotly; solo se redibuja lo que cambió. Con
+'uirevision' en el layout el navegador conserva el zoom y aplica el cambio con
+Plotly.react. Cuando nada cambió, el JSON de la figura sale idéntico y Streamlit no
+vuelve a enviarlo (cache de mensajes por hash).
+"""
+
+
+class FigureCache:
+    def __init__(self):
+        self.fig = None
+        self.base_key = None
+        self.layers = {}      # nombre -> (clave, uids de trazas, nombres de imágenes)
+        self._used = []
+
+    def begin(self, base_key, create, update):
+        """Figura del rerun: nueva si cambió 'base_key' (modo), si no la anterior con el layout actualizado"""
+        if self.fig is None or base_key != self.base_key:
+            self.fig, self.base_key, self.layers = create(), base_key, {}
+        else:
+            update(self.fig)
+        self._used = []
+        return self.fig
+
+    def layer(self, name, key, draw):
+        """Dibuja la capa solo si 'key' cambió. Devuelve (reutilizada, cantidad de puntos)"""
+        fig = self.fig
+        self._used.append(name)
+        cached = self.layers.get(name)
+        if cached is not None and cached[0] == key:
+            return True, self._points(cached[1])
+        if cached is not None:
+            self._drop(cached[1], cached[2])
+        n_traces, n_images = len(fig.data), len(fig.layout.images)
+        draw()
+        uids = []
+        for i, trace in enumerate(fig.data[n_traces:]):
+            trace.uid = f"{name}-{i}"
+            uids.append(trace.uid)
+        names = []
+        for i, image in enumerate(fig.layout.images[n_images:]):
+            image.name = f"{name}-{i}"
+            names.append(image.name)
+        self.layers[name] = (key, uids, names)
+        return False, self._points(uids)
+
+    def refresh(self, name, key, draw):
+        """Como layer(), pero fuera de begin/end: redibuja una capa conservando el orden"""
+        used = self._used
+        self._used = []
+        result = self.layer(name, key, draw)
+        self._used = used if name in used else used + [name]
+        self.end()
+        return result
+
+    def invalidate(self, name):
+        """La capa se redibuja en el próximo layer() aunque la clave coincida"""
+        if name in self.layers:
+            _, uids, names = self.layers[name]
+            self.layers[name] = (None, uids, names)
+
+    def end(self):
+        """Quita las capas que no se pidieron en este rerun y ordena las trazas como se pidieron"""
+        for name in [n for n in self.layers if n not in self._used]:
+            _, uids, names = self.layers.pop(name)
+            self._drop(uids, names)
+        by_uid = {t.uid: t for t in self.fig.data}
+        self.fig.data = [by_uid[u] for n in self._used for u in self.layers[n][1]]
+        return self.fig
+
+    def _drop(self, uids, names):
+        fig = self.fig
+        if uids:
+            fig.data = [t for t in fig.data if t.uid not in uids]
+        if names:
+            fig.layout.images = [im for im in fig.layout.images if im.name not in names]
+
+    def _points(self, uids):
+        return sum(len(t.x) for t in self.fig.data if t.uid in uids and t.x is not None)
@@ -0,0 +1,152 @@
+# grid.py
+"""Grillas de coordenadas: eclíptica, ecuador, meridianos/paralelos, plano galáctico y anillos alt/az.
+
+La geometría fija al cielo (vectores unitarios J2000) se genera una sola vez;
+por cuadro solo se aplica la rotación al horizonte y se densifican los tramos
+que lo necesitan (cruce del horizonte, costura del Panorama, tramos largos en pantalla).
+"""
+from functools import lru_cache
+import numpy as np
+import astrometry
+from engine import SkyEngine
+
+ALT_MIN = -5.0        # Debajo de esto no se dibuja
+STEP_DEG = 2.0        # Muestreo base de los círculos
+SCREEN_STEP = 1.5     # Largo máximo de un tramo en pantalla (grados)
+MAX_SUB = 32          # Subdivisiones máximas por tramo
+
+# Galáctico -> ecuatorial J2000 (transpuesta de la matriz de Hipparcos)
+GAL_TO_EQ = np.array([[-0.0548755604, -0.8734370902, -0.4838350155],
+                      [0.4941094279, -0.4448296300, 0.7469822445],
+                      [-0.8676661490, -0.1980763734, 0.4559837762]]).T
+
+# Estilo de cada capa: (nombre, color, trazo)
+LAYERS = {
+    'ecliptic': ("Eclíptica", 'rgba(255, 255, 0, 0.2)', 'dot'),
+    'equator': ("Ecuador Celeste", 'rgba(100,100,255,0.2)', 'solid'),
+    'radec': ("Grilla AR/Dec", 'rgba(120,140,200,0.12)', 'solid'),
+    'galactic': ("Plano Galáctico", 'rgba(255,150,200,0.2)', 'dash'),
+    'altaz': ("Grilla Alt/Az", 'rgba(120,200,120,0.15)', 'dot'),
+}
+DEFAULT_LAYERS = ['ecliptic', 'equator']
+
+
+def _circle(step=STEP_DEG):
+    t = np.radians(np.arange(0, 360 + step / 2, step))
+    return np.column_stack((np.cos(t), np.sin(t), np.zeros_like(t)))
+
+
+def _join(parts):
+    """Une polilíneas separándolas con una fila NaN"""
+    gap = np.full((1, 3), np.nan)
+    return np.vstack([p for part in parts for p in (part, gap)][:-1])
+
+
+def _radec(ra_hrs, dec_deg):
+    return astrometry.unit_vectors(ra_hrs, dec_deg)
+
+
+@lru_cache(maxsize=None)
+def sky_vectors(kind):
+    """Vectores unitarios (n x 3) de la capa; NaN separa polilíneas. Solo lectura."""
+    if kind == 'equator':
+        v = _circle()
+    elif kind == 'ecliptic':
+        v = _circle() @ astrometry.rot_x(astrometry.mean_obliquity(0.0))
+    elif kind == 'galactic':
+        v = _circle() @ GAL_TO_EQ.T
+    elif kind == 'radec':
+        dec = np.arange(-80, 80 + STEP_DEG / 2, STEP_DEG)
+        ra = np.arange(0, 360 + STEP_DEG / 2, STEP_DEG) / 15
+        meridians = [_radec(np.full_like(dec, h), dec) for h in range(0, 24, 2)]
+        parallels = [_radec(ra, np.full_like(ra, d)) for d in (-60, -30, 30, 60)]
+        v = _join(meridians + parallels)
+    elif kind == 'altaz':
+        # Fija al horizonte: en el marco (Norte, Este, Cenit)
+        alt = np.arange(0, 90 + STEP_DEG / 2, STEP_DEG)
+        az = np.arange(0, 360 + STEP_DEG / 2, STEP_DEG)
+        rings = [_radec(az / 15, np.full_like(az, a)) for a in (0, 30, 60)]
+        spokes = [_radec(np.full_like(alt, z / 15), alt) for z in range(0, 360, 45)]
+        v = _join(rings + spokes)
+    else:
+        raise ValueError(f"Capa de grilla desconocida: {kind}")
+    v = np.ascontiguousarray(v)
+    v.setflags(write=False)
+    return v
+
+
+def frame_matrix(lat, lon, dt_utc, precise=False):
+    """Rotación J2000 -> (Norte, Este, Cenit). precise: con precesión y nutación."""
+    if precise:
+        return astrometry.horizontal_matrix(dt_utc, lat, lon)
+    phi = np.radians(lat)
+    sp, cp = np.sin(phi), np.cos(phi)
+    return np.array([[-sp, 0, cp], [0, 1, 0], [cp, 0, sp]]) @ astrometry.rot_z(SkyEngine.get_lst(lon, dt_utc))
+
+
+def _alt_az(h):
+    alt = np.degrees(np.arcsin(np.clip(h[:, 2], -1, 1)))
+    az = np.degrees(np.arctan2(h[:, 1], h[:, 0])) % 360
+    return alt, az
+
+
+def _refine(h, counts):
+    """Subdivide el tramo i->i+1 en counts[i] partes (interpolación sobre la esfera)"""
+    n = len(h)
+    starts = np.repeat(np.arange(n - 1), counts)
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    frac = ((np.arange(len(starts)) - first) / np.repeat(counts, counts))[:, None]
+    p = np.where(frac == 0, h[starts], h[starts] * (1 - frac) + h[starts + 1] * frac)
+    p = np.vstack((p, h[-1:]))
+    return p / np.linalg.norm(p, axis=1, keepdims=True)
+
+
+def project(h, config, precise=False):
+    """Vectores horizontales -> (px, py) con cortes NaN bajo ALT_MIN y en la costura del Panorama"""
+    panorama = config['mode'] == "Panorama"
+    alt, az = _alt_az(h)
+    px, py = SkyEngine.transform(az, alt, config)
+
+    # Densificación adaptativa: tramos largos en pantalla, que cruzan el horizonte o la costura
+    dx, dy = np.diff(px), np.diff(py)
+    seam = np.abs(dx) > 180 if panorama else np.zeros(len(dx), bool)
+    if panorama:
+        dx = (dx + 180) % 360 - 180
+    length = np.nan_to_num(np.hypot(dx, dy))
+    counts = np.clip(np.ceil(length / SCREEN_STEP), 1, MAX_SUB).astype(np.intp)
+    edge = (alt[:-1] >= ALT_MIN) != (alt[1:] >= ALT_MIN)
+    counts[(seam | edge) & np.isfinite(length)] = MAX_SUB
+    if (counts > 1).any():
+        h = _refine(h, counts)
+        alt, az = _alt_az(h)
+        px, py = SkyEngine.transform(az, alt, config)
+
+    if precise:
+        alt = alt + astrometry.refraction(alt)
+        px, py = SkyEngine.transform(az, alt, config)
+    hidden = ~(alt >= ALT_MIN)
+    px, py = np.where(hidden, np.nan, px), np.where(hidden, np.nan, py)
+    if panorama:
+        cuts = np.flatnonzero(np.abs(np.diff(px)) > 180) + 1
+        px, py = np.insert(px, cuts, np.nan), np.insert(py, cuts, np.nan)
+    # Un solo NaN por corte: menos puntos en el JSON de la figura
+    gap = np.isnan(px)
+    keep = ~(gap & np.concatenate(([True], gap[:-1])))
+    return px[keep], py[keep]
+
+
+@lru_cache(maxsize=32)
+def _horizon_layer(kind, mode, view):
+    px, py = project(sky_vectors(kind), {'mode': mode, 'view': view})
+    px.setflags(write=False); py.setflags(write=False)
+    return px, py
+
+
+def grid_line(kind, lat, lon, dt_utc, config):
+    """(px, py) de la capa para el instante y la vista dados"""
+    if kind == 'altaz':
+        # No depende del tiempo: cacheada por (modo, vista)
+        return _horizon_layer(kind, config['mode'], config.get('view', 0))
+    precise = config.get('precise', False)
+    h = sky_vectors(kind) @ frame_matrix(lat, lon, dt_utc, precise).T
+    return project(h, config, precise)
@@ -0,0 +1,95 @@
+# headless.py
+"""Genera el mapa del cielo sin navegador (CI, lotes, perfiles).
+
+Ejemplos:
+  python headless.py --mag 5 --out cielo.html
+  python headless.py --synthetic 120000 --profile sample
+  SKY_CATALOG=stars.parquet python headless.py --mode "Cenit (Circular)" --out cielo.json
+  python headless.py --synthetic 120000 --mag 8 --out cielo.png
+"""
+import argparse
+import base64
+import datetime
+import sys
+
+import pytz
+
+from constants import CON_ES, CIUDADES
+from data_manager import DataManager
+from instrumentation import StageRecorder
+from pipeline import build_sky_figure
+from astrometry import EpochPropagator
+from timezones import observer_tz
+from profiling import maybe_profile, profiling_requested, MODES
+from synthetic import load_synthetic
+
+
+def load_catalogs(synthetic=None):
+    """Catálogos reales (descarga si faltan) o sintéticos (synthetic.py) para correr sin red"""
+    if not synthetic:
+        DataManager.download_all()
+        return DataManager.load_all(CON_ES)
+    return load_synthetic(synthetic)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ciudad', default="La Plata, Arg", choices=list(CIUDADES))
+    parser.add_argument('--lat', type=float, help="latitud (reemplaza a --ciudad; la zona horaria se deduce)")
+    parser.add_argument('--lon', type=float, help="longitud (reemplaza a --ciudad)")
+    parser.add_argument('--fecha', type=datetime.date.fromisoformat, default=datetime.date.today())
+    parser.add_argument('--hora', type=datetime.time.fromisoformat, default=datetime.time(22, 0))
+    parser.add_argument('--mode', default="Panorama", choices=["Panorama", "Cenit (Circular)", "Mapa Galáctico 3D"])
+    parser.add_argument('--mag', type=float, default=5.0)
+    parser.add_argument('--dist-max', type=float, default=500)
+    parser.add_argument('--todo', action='store_true', help="activa constelaciones, grilla, planetas y Messier")
+    parser.add_argument('--synthetic', type=int, help="usar un catálogo sintético de N estrellas (sin red)")
+    parser.add_argument('--profile', choices=MODES, help="perfilar el rerun (también SKY_PROFILE)")
+    parser.add_argument('--render', default="plotly", choices=["plotly", "raster"],
+                        help="raster: estrellas, líneas y grilla como imagen de fondo")
+    parser.add_argument('--out', help="guardar la figura (.html, .json o .png; .png implica --render raster)")
+    args = parser.parse_args(argv)
+
+    lat, lon, _ = CIUDADES[args.ciudad]
+    if args.lat is not None and args.lon is not None:
+        lat, lon = args.lat, args.lon
+    local_tz = observer_tz(lat, lon)
+    config = {
+        'lat': lat, 'lon': lon, 'view': 0, 'fov': 100, 'mag': args.mag, 'scale': 1.0,
+        'show_const': args.todo, 'show_grid': args.todo, 'mode': args.mode,
+        'd': args.fecha, 't': args.hora, 'sel': None, 'show_planet': args.todo,
+        'dist_max': args.dist_max, 'show_mess': args.todo, 'show_images': False,
+        'render': "raster" if args.out and args.out.endswith('.png') else args.render,
+    }
+    dt_utc = local_tz.localize(datetime.datetime.combine(args.fecha, args.hora)).astimezone(pytz.utc)
+
+    recorder = StageRecorder(enabled=True)
+    with recorder.stage('catalog_load') as s:
+        df_stars, const_data, df_exo = load_catalogs(args.synthetic)
+        s['rows'] = len(df_stars)
+
+    with maybe_profile("headless", args.profile or profiling_requested()) as prof:
+        fig = build_sky_figure(df_stars, const_data, df_exo, config, dt_utc, local_tz, recorder,
+                               epochs=EpochPropagator(df_stars))
+
+    for st_ in recorder.stages:
+        print(f"{st_['stage']:<24}{st_['seconds'] * 1000:>10.1f} ms  filas={st_['rows']}  bytes={st_['bytes']}")
+    if prof:
+        print(f"Perfil: {prof['path']}")
+    if args.out:
+        if args.out.endswith('.html'):
+            fig.write_html(args.out)
+        elif args.out.endswith('.png'):
+            # El fondo rasterizado tal cual, sin pasar por Plotly/kaleido
+            if not fig.layout.images:
+                parser.error("--out .png no está disponible en el Mapa Galáctico 3D")
+            with open(args.out, 'wb') as f:
+                f.write(base64.b64decode(fig.layout.images[-1].source.split(',', 1)[1]))
+        else:
+            with open(args.out, 'w') as f:
+                f.write(fig.to_json())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
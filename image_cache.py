@@ -0,0 +1,97 @@
+# image_cache.py
+"""Miniaturas locales de las fotos de cielo profundo.
+
+Las originales se descargan una sola vez (Downloader) y se reducen con Pillow a
+MAX_PX de lado. La figura las referencia por la ruta estática de Streamlit (el
+navegador las cachea entre reruns) o, sin servidor, como data URI.
+"""
+import os
+import base64
+import logging
+import threading
+from lazy_import import lazy_module
+from downloader import Downloader
+
+st = lazy_module("streamlit")
+
+logger = logging.getLogger(__name__)
+
+
+def static_serving_enabled():
+    """True si Streamlit sirve la carpeta 'static/' (server.enableStaticServing)"""
+    try:
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+
+class ImageCache:
+    ORIG_DIR = ".image_cache"
+    THUMB_DIR = os.path.join("static", "thumbs")
+    STATIC_URL = "app/static/thumbs"
+    MAX_PX = 256
+    QUALITY = 80
+
+    def __init__(self, images, downloader=None, static_route=None, max_px=None):
+        self.images = images  # {código: [ra, dec, url, tamaño]} como MESSIER_IMAGES
+        self.downloader = downloader or Downloader()
+        self.static_route = static_serving_enabled() if static_route is None else static_route
+        self.max_px = max_px or self.MAX_PX
+        self._uris = {}
+        self._lock = threading.Lock()
+
+    def orig_path(self, code):
+        return os.path.join(self.ORIG_DIR, f"{code}.img")
+
+    def thumb_path(self, code):
+        return os.path.join(self.THUMB_DIR, f"{code}.jpg")
+
+    def prepare(self, max_workers=4):
+        """Descarga en paralelo las originales que falten y genera sus miniaturas. Devuelve {código: ok}"""
+        os.makedirs(self.ORIG_DIR, exist_ok=True)
+        os.makedirs(self.THUMB_DIR, exist_ok=True)
+        missing = [c for c in self.images if not os.path.exists(self.thumb_path(c))]
+        results = self.downloader.fetch_all([(self.images[c][2], self.orig_path(c)) for c in missing],
+                                            max_workers=max_workers) if missing else {}
+        status = {}
+        for code in self.images:
+            if code not in missing:
+                status[code] = True
+                continue
+            res = results.get(self.orig_path(code))
+            if isinstance(res, Exception):
+                logger.warning("No se pudo descargar la imagen de %s: %s", code, res)
+                status[code] = False
+                continue
+            status[code] = self._make_thumb(self.orig_path(code), self.thumb_path(code))
+        return status
+
+    def _make_thumb(self, src, dest):
+        from PIL import Image
+        try:
+            with Image.open(src) as im:
+                im = im.convert('RGB')
+                im.thumbnail((self.max_px, self.max_px))
+                tmp = dest + ".tmp"
+                im.save(tmp, 'JPEG', quality=self.QUALITY, optimize=True)
+            os.replace(tmp, dest)
+            return True
+        except OSError as e:
+            logger.warning("Imagen inválida %s: %s", src, e)
+            return False
+
+    def source(self, code):
+        """Origen para fig.add_layout_image: ruta estática, data URI o, sin miniatura, la URL remota"""
+        path = self.thumb_path(code)
+        if not os.path.exists(path):
+            return self.images[code][2]
+        if self.static_route:
+            return f"{self.STATIC_URL}/{code}.jpg"
+        with self._lock:
+            uri = self._uris.get(code)
+        if uri is None:
+            with open(path, 'rb') as f:
+                uri = "data:image/jpeg;base64," + base64.b64encode(f.read()).decode('ascii')
+            with self._lock:
+                self._uris[code] = uri
+        return uri
@@ -0,0 +1,81 @@
+# instrumentation.py
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+from lazy_import import lazy_module
+
+st = lazy_module("streamlit")
+pd = lazy_module("pandas")
+
+logger = logging.getLogger("sky.metrics")
+
+DEBUG_ENV = "SKY_DEBUG"
+METRICS_FILE_ENV = "SKY_METRICS_FILE"  # Archivo .prom para el textfile collector de Prometheus
+
+
+def debug_enabled(query_params=None):
+    """Instrumentación activa si SKY_DEBUG=1 o la URL trae ?debug=1"""
+    if os.environ.get(DEBUG_ENV, "").lower() in ("1", "true", "yes"):
+        return True
+    return bool(query_params) and str(query_params.get("debug", "")).lower() in ("1", "true")
+
+
+class StageRecorder:
+    """Mide cada etapa de un rerun (tiempo, filas, bytes). Desactivado no mide nada."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Uso: with rec.stage('alt_az', rows=n) as s: ...; s['bytes'] = ..."""
+        record = {'stage': name, 'seconds': 0.0, 'rows': rows, 'bytes': None}
+        if not self.enabled:
+            yield record
+            return
+        t0 = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - t0
+            self.stages.append(record)
+
+    def total(self):
+        return sum(s['seconds'] for s in self.stages)
+
+    def to_prometheus(self, prefix="sky"):
+        """Exporta las etapas en el formato de texto de Prometheus"""
+        lines = []
+        for metric, key, help_txt in (("stage_seconds", 'seconds', "Duración de la etapa en el último rerun"),
+                                      ("stage_rows", 'rows', "Filas procesadas por la etapa"),
+                                      ("stage_bytes", 'bytes', "Bytes producidos por la etapa")):
+            samples = [s for s in self.stages if s[key] is not None]
+            if not samples: continue
+            lines.append(f"# HELP {prefix}_{metric} {help_txt}")
+            lines.append(f"# TYPE {prefix}_{metric} gauge")
+            for s in samples:
+                lines.append(f'{prefix}_{metric}{{stage="{s["stage"]}"}} {s[key]}')
+        return "\n".join(lines) + "\n"
+
+    def export(self):
+        """Una línea JSON al log y, si está configurado, el archivo .prom"""
+        if not self.enabled: return
+        logger.info(json.dumps({'total_seconds': self.total(), 'stages': self.stages}))
+        path = os.environ.get(METRICS_FILE_ENV)
+        if path:
+            tmp = path + ".tmp"
+            with open(tmp, 'w') as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp, path)
+
+    def render_panel(self):
+        """Panel de depuración dentro de la app"""
+        if not self.enabled: return
+        with st.expander(f"🐞 Tiempos del rerun: {self.total() * 1000:.0f} ms"):
+            df = pd.DataFrame(self.stages)
+            df['ms'] = (df['seconds'] * 1000).round(2)
+            st.dataframe(df[['stage', 'ms', 'rows', 'bytes']], use_container_width=True, hide_index=True)
+            st.code(self.to_prometheus(), language="text")
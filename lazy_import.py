@@ -0,0 +1,32 @@
+# lazy_import.py
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Módulo que se importa recién cuando se accede a uno de sus atributos"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_module(name):
+    """Devuelve el módulo si ya está cargado, o un proxy que lo importa al primer uso"""
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
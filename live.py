@@ -0,0 +1,86 @@
+# live.py
+"""Modo "cielo en vivo": el reloj avanza solo y la figura se actualiza liviana.
+
+Entre reconstrucciones completas, las capas fijas al cielo (estrellas, líneas de
+constelaciones, cielo profundo) no se redibujan: sus puntos se pasan a vectores
+horizontales una vez y en cada tic se rotan por el ángulo sidéreo transcurrido
+(una matriz 3x3). Solo cambian x/y de las trazas; tooltips, colores y layout quedan.
+Grilla, planetas y fotos son baratos y se redibujan. Cada REBUILD_EVERY se rearma
+todo (estrellas que recién salieron, fecha de la trayectoria).
+"""
+import datetime
+import numpy as np
+from engine import SkyEngine
+from grid import frame_matrix
+
+CADENCES = {10: "10 s", 30: "30 s", 60: "1 min", 300: "5 min"}   # Segundos entre tics
+DEFAULT_CADENCE = 30
+REBUILD_EVERY = datetime.timedelta(minutes=10)
+
+# Capas que se rotan y altura mínima con la que se muestran (mismos cortes que al dibujarlas)
+ROTATING = {'draw_stars': -1.0, 'draw_exoplanets': -1.0, 'draw_constellations': -20.0, 'draw_messier': 0.0}
+
+
+def to_vectors(px, py, config):
+    """Inversa de SkyEngine.transform: (px, py) -> vectores (Norte, Este, Cenit); NaN se mantiene"""
+    px, py = np.asarray(px, dtype=np.float64), np.asarray(py, dtype=np.float64)
+    if config['mode'] == "Panorama":
+        az, alt = np.radians(px + config['view']), np.radians(py)
+    else:
+        az, alt = np.arctan2(px, py), np.radians(90 - np.hypot(px, py))
+    return np.column_stack((np.cos(alt) * np.cos(az), np.cos(alt) * np.sin(az), np.sin(alt)))
+
+
+def from_vectors(h, config):
+    """Vectores horizontales -> (alt, px, py)"""
+    alt = np.degrees(np.arcsin(np.clip(h[:, 2], -1, 1)))
+    az = np.degrees(np.arctan2(h[:, 1], h[:, 0])) % 360
+    px, py = SkyEngine.transform(az, alt, config)
+    return alt, px, py
+
+
+class LiveSky:
+    """Vectores horizontales de las capas rotables, tomados de la figura en el instante t0"""
+
+    def __init__(self, figures, config, dt_utc):
+        self.figures = figures
+        self.config = {k: config.get(k) for k in ('lat', 'lon', 'mode', 'view', 'precise')}
+        self.t0 = dt_utc
+        self._base = frame_matrix(config['lat'], config['lon'], dt_utc, config.get('precise', False))
+        self._rot = np.eye(3)   # Rotación aplicada en el último tic (la de la figura que se ve)
+        self._layers = []   # (traza, vectores, altura mínima, es línea)
+        for trace in figures.fig.data:
+            layer = (trace.uid or '').rsplit('-', 1)[0]
+            if layer not in ROTATING or trace.x is None or not len(trace.x): continue
+            h = to_vectors(np.array(trace.x, dtype=np.float64), np.array(trace.y, dtype=np.float64), config)
+            self._layers.append((trace, h, ROTATING[layer], 'lines' in (trace.mode or '')))
+
+    def matches(self, config):
+        """False si cambió algo que invalida los vectores (sitio, modo, vista)"""
+        return all(config.get(k) == v for k, v in self.config.items())
+
+    def due(self, dt_utc):
+        return dt_utc - self.t0 >= REBUILD_EVERY
+
+    def advance(self, dt_utc):
+        """Rota las capas al instante dt_utc (solo x/y de las trazas)"""
+        c = self.config
+        rot = self._rot = frame_matrix(c['lat'], c['lon'], dt_utc, c['precise'] or False) @ self._base.T
+        for trace, h, alt_min, lines in self._layers:
+            alt, px, py = from_vectors(h @ rot.T, c)
+            hidden = ~(alt > alt_min)
+            if lines and c['mode'] == "Panorama":
+                # Como en draw_constellations: sin tramos que crucen la costura del Panorama
+                jump = np.abs(np.diff(px)) >= 120
+                hidden[:-1] |= jump
+                hidden[1:] |= jump
+            trace.x, trace.y = np.where(hidden, np.nan, px), np.where(hidden, np.nan, py)
+        # Las trazas ya no corresponden a la clave con la que se guardaron
+        for name in ROTATING:
+            self.figures.invalidate(name)
+
+    def to_base(self, px, py):
+        """Punto de la figura mostrada -> coordenadas de pantalla en t0 (las del kernel)"""
+        h = to_vectors([px], [py], self.config) @ self._rot   # Inversa de h @ rot.T
+        _, bx, by = from_vectors(h, self.config)
+        return float(np.asarray(bx)[0]), float(np.asarray(by)[0])
@@ -0,0 +1,95 @@
+# photometry.py
+"""Modelo de brillo de las estrellas: color, tamaño y opacidad en arrays de numpy.
+
+El tamaño sale del flujo relativo al límite (10^(-0.4 (m - lim))) con compresión
+perceptual (potencia 1/4, como la respuesta del ojo), así los campos densos no se
+empastan y las brillantes no tapan todo. El color sale del tipo espectral y, si falta
+('?'), del índice B-V. Los colores se calculan una vez por catálogo y los tamaños una
+vez por (magnitud límite, escala).
+"""
+import threading
+from collections import OrderedDict
+import numpy as np
+from lazy_import import lazy_module
+from constants import SPECTRAL_ANCHORS
+
+pd = lazy_module("pandas")
+
+# B-V típico al comienzo de cada clase (O0 ... M9/Z): interpola la misma paleta que los tipos
+BV_ANCHORS = {'O': -0.33, 'B': -0.30, 'A': 0.0, 'F': 0.30, 'G': 0.58, 'K': 0.81, 'M': 1.40, 'Z': 2.0}
+GAMMA = 0.25               # Compresión perceptual del flujo
+SIZE_GAIN = 0.6            # Tamaño extra por unidad de flujo comprimido (≈ 0.15 px por magnitud cerca del límite)
+SIZE_MAX_EXTRA = 8.0       # Tope en px sobre 'scale' (Sirius con límites altos)
+OPACITY_MIN = 0.4          # Estrellas en el límite
+MAX_DIST_PC = 1e5          # HYG usa 100000 pc para "distancia desconocida"
+CACHE_SIZE = 8             # Combinaciones (límite, escala) guardadas
+
+
+def bv_to_hex(ci):
+    """Índice de color B-V -> '#rrggbb' (NaN -> blanco)"""
+    ci = np.asarray(ci, dtype=np.float64)
+    xs = np.array(list(BV_ANCHORS.values()))
+    rgb = np.column_stack([np.interp(ci, xs, [SPECTRAL_ANCHORS[k][ch] for k in BV_ANCHORS]) for ch in range(3)])
+    rgb = np.where(np.isfinite(ci)[:, None], rgb, 255).astype(np.int64)
+    # Pocos colores distintos: se formatea cada uno una vez
+    uniques, codes = np.unique(rgb[:, 0] * 65536 + rgb[:, 1] * 256 + rgb[:, 2], return_inverse=True)
+    return np.array(['#{:06x}'.format(u) for u in uniques], dtype=object)[codes.ravel()]
+
+
+def star_colors(spect, ci):
+    """Color por tipo espectral (una vez por tipo distinto); sin tipo ('?'), por B-V"""
+    from engine import SkyEngine
+    spect = pd.Series(spect, dtype=object).reset_index(drop=True)
+    known = spect.notna() & ~spect.isin(['?', ''])
+    colors = spect[known].map({s: SkyEngine.get_spectral_color(s) for s in spect[known].unique()})
+    out = bv_to_hex(ci)
+    out[known.to_numpy()] = colors.to_numpy()
+    return out
+
+
+def apparent_size(mag, mag_lim, scale):
+    """(tamaño en px, opacidad) según el flujo relativo al límite"""
+    flux = 10 ** (-0.4 * (np.asarray(mag, dtype=np.float64) - mag_lim))
+    compressed = np.maximum(flux, 1.0) ** GAMMA
+    size = scale + np.minimum(SIZE_GAIN * (compressed - 1), SIZE_MAX_EXTRA)
+    opacity = np.clip(OPACITY_MIN + 0.3 * np.log10(np.maximum(flux, 1.0)), OPACITY_MIN, 1.0)
+    return size, opacity
+
+
+def absolute_magnitude(mag, dist_pc):
+    """M = m - 5 log10(d / 10 pc); NaN si la distancia no es confiable"""
+    d = np.asarray(dist_pc, dtype=np.float64)
+    d = np.where((d > 0) & (d < MAX_DIST_PC), d, np.nan)
+    return np.asarray(mag, dtype=np.float64) - 5 * np.log10(d / 10)
+
+
+def luminosity_size(absmag, scale):
+    """Tamaño para el mapa 3D: luminosidad (relativa al Sol, M≈4.8) con la misma compresión"""
+    lum = 10 ** (-0.4 * (np.nan_to_num(np.asarray(absmag, dtype=np.float64), nan=4.8) - 4.8))
+    return scale * np.clip(1.0 + 0.5 * lum ** GAMMA, 1.0, 6.0)
+
+
+class StarPhotometry:
+    """Colores del catálogo (fijos) y tamaños/opacidades por (límite, escala), por fila posicional"""
+
+    def __init__(self, df_stars):
+        self.n = len(df_stars)
+        self.mag = df_stars['mag'].to_numpy(dtype=np.float64)
+        self.color = star_colors(df_stars['spect'], df_stars['ci'])
+        self._sizes = OrderedDict()
+        self._lock = threading.Lock()   # Una instancia compartida entre sesiones (cache_resource)
+
+    def sizes(self, mag_lim, scale):
+        """(tamaño, opacidad) de todo el catálogo; se calcula una vez por combinación"""
+        key = (float(mag_lim), float(scale))
+        with self._lock:
+            if key in self._sizes:
+                self._sizes.move_to_end(key)
+                return self._sizes[key]
+            arrays = apparent_size(self.mag, *key)
+            for a in arrays:
+                a.setflags(write=False)
+            self._sizes[key] = arrays
+            if len(self._sizes) > CACHE_SIZE:
+                self._sizes.popitem(last=False)
+            return arrays
@@ -0,0 +1,197 @@
+# pipeline.py
+import numpy as np
+from lazy_import import lazy_module
+import constants
+from constants import CON_ES
+from engine import SkyEngine, SkyKernel
+from sky_plotter import SkyPlotter
+from instrumentation import StageRecorder
+from data_manager import DataManager
+from figure_cache import FigureCache
+from styles import get_plotly_layout
+
+pd = lazy_module("pandas")
+
+RASTER_HOVER = 300   # Modo imagen: estrellas que siguen siendo puntos de Plotly (tooltip y clic)
+
+
+def get_kernel(df_stars, kernel=None, epoch=None):
+    """Reutiliza el kernel si corresponde al mismo catálogo (y época); si no, lo actualiza o crea.
+
+    epoch=None conserva la época que ya tenga el kernel (J2000 si es nuevo).
+    """
+    catalog = DataManager.catalog_version(df_stars)
+    if kernel is not None and kernel.catalog == catalog and kernel.n == len(df_stars):
+        if epoch is not None and kernel.epoch != epoch:
+            kernel.set_positions(df_stars['ra'], df_stars['dec'], epoch)
+        return kernel
+    return SkyKernel(df_stars['ra'], df_stars['dec'], epoch or 0.0, catalog)
+
+
+_const_rows = {}   # (catalog, pares) -> filas del catálogo que usan las constelaciones
+
+
+def constellation_rows(df_stars, const_data):
+    """Máscara de las estrellas de las líneas de constelaciones (una vez por catálogo)"""
+    hips = {h for c in const_data for pair in c['pairs'] for h in pair}
+    key = (DataManager.catalog_version(df_stars), len(hips))
+    mask = _const_rows.get(key)
+    if mask is None:
+        mask = df_stars['hip'].isin(hips).to_numpy()
+        _const_rows.clear()
+        _const_rows[key] = mask
+    return mask
+
+
+def apply_epoch(df_stars, dt_utc, epochs=None):
+    """Catálogo con posiciones propagadas a la fecha (si hay EpochPropagator)"""
+    if epochs is None:
+        return df_stars, 0.0
+    ra, dec, dist_ly, key = epochs.at(dt_utc)
+    if key == 0:
+        return df_stars, 0.0
+    return df_stars.assign(ra=ra, dec=dec, dist_ly=dist_ly), key
+
+
+def build_sky_figure(df_stars, const_data, df_exo, config, dt_utc, local_tz, recorder=None, kernel=None,
+                     epochs=None, deep_sky=None, images=None, index=None, figures=None, photometry=None):
+    """Cálculos astronómicos + dibujo de un rerun, sin depender de Streamlit.
+
+    Cada etapa queda medida en 'recorder' (si está activo). 'kernel' (SkyKernel)
+    se puede pasar de un rerun al siguiente para no recalcular sin/cos(dec), y
+    'epochs' (EpochPropagator) aplica el movimiento propio a la fecha elegida.
+    'deep_sky' es el catálogo de DataManager.load_deep_sky (se lee si falta) e
+    'images' un ImageCache para servir miniaturas locales e 'index' un StarIndex
+    para resolver la selección sin recorrer el catálogo.
+
+    Con config['render'] == 'raster' la grilla, las líneas de constelaciones y las
+    estrellas van en un PNG de fondo (raster.py) y solo las RASTER_HOVER más
+    brillantes quedan como puntos interactivos.
+
+    'figures' (FigureCache) se pasa de un rerun al siguiente: las capas cuyas
+    entradas no cambiaron se reutilizan en vez de redibujarse. 'photometry'
+    (StarPhotometry del catálogo) deja color y tamaño de las estrellas calculados
+    una vez por (magnitud límite, escala).
+    """
+    rec = recorder or StageRecorder()
+    lat, lon = config['lat'], config['lon']
+
+    with rec.stage('epoch', rows=len(df_stars)):
+        df_stars, epoch = apply_epoch(df_stars, dt_utc, epochs)
+
+    if config['mode'] == "Mapa Galáctico 3D":
+        # El cubo 3D no usa alt/az: no hace falta el kernel
+        with rec.stage('draw_galactic_cube') as s:
+            fig = SkyPlotter.draw_galactic_cube(df_stars, const_data, df_exo, config, SkyEngine, index)
+            s['rows'] = sum(len(t.x) for t in fig.data if t.x is not None)
+        _measure_payload(fig, rec)
+        return fig
+
+    # A. Procesar Estrellas: alt/az + proyección (Panorama o Cenit) en una pasada
+    with rec.stage('alt_az_projection', rows=len(df_stars)):
+        alt, az, px, py = get_kernel(df_stars, kernel, epoch).compute(lat, lon, dt_utc, config)
+        # Solo se materializan las filas que se dibujan (visibles y estrellas de constelaciones
+        # sobre -20°), con copias de esas filas: los buffers del kernel se reutilizan
+        keep = (alt > -1) & (df_stars['mag'].to_numpy() <= config['mag'])
+        if config['show_const']:
+            keep |= constellation_rows(df_stars, const_data) & (alt > -20)
+        rows = np.flatnonzero(keep)
+        stars_df = df_stars.take(rows).assign(alt=alt[rows], az=az[rows], px=px[rows], py=py[rows])
+
+    with rec.stage('process_stars') as s:
+        if photometry is not None and photometry.n != len(df_stars):
+            photometry = None
+        visible = SkyEngine.process_stars(stars_df, config, dt_utc, photometry, rows)
+        s['rows'] = len(visible)
+
+    # B. Procesar Planetas. ephem solo se carga si se muestran
+    with rec.stage('process_planets') as s:
+        if config['show_planet']:
+            df_planets = SkyEngine.process_planets(config, dt_utc, CON_ES)
+        else:
+            df_planets = pd.DataFrame()
+        s['rows'] = len(df_planets)
+
+    if config['show_mess'] and deep_sky is None:
+        deep_sky = DataManager.load_deep_sky(CON_ES)
+
+    # Claves de entrada por capa: si no cambian, la capa del rerun anterior se reutiliza
+    cache = figures or FigureCache()
+    catalog = DataManager.catalog_version(df_stars)
+    frame = (lat, lon, dt_utc, config['mode'], config['view'], config.get('precise', False), epoch, catalog)
+    raster = config.get('render') == 'raster'
+    fig = cache.begin(config['mode'], lambda: SkyPlotter.create_base_fig(config),
+                      lambda f: f.update_layout(get_plotly_layout(config)))
+    layers = []
+    if raster:
+        layers.append(('rasterize', frame + (config['mag'], config['show_grid'], tuple(config.get('grid_layers', ())),
+                                             config['show_const']), lambda: _rasterize(fig, stars_df, visible, const_data,
+                                                                                        config, dt_utc, rec)))
+    else:
+        layers.append(('draw_grid', frame + (config['show_grid'], tuple(config.get('grid_layers', ()))),
+                       lambda: SkyPlotter.draw_grid(fig, lat, lon, dt_utc, config, SkyEngine)))
+    layers += [
+        ('draw_constellations', frame + (config['show_const'], raster),
+         lambda: SkyPlotter.draw_constellations(fig, stars_df, const_data, config, lines=not raster)),
+        ('draw_messier', frame + (config['show_mess'], config.get('dso_mag'),
+                                     None if deep_sky is None else len(deep_sky)),
+         lambda: SkyPlotter.draw_messier(fig, lat, lon, dt_utc, config, SkyEngine, deep_sky)),
+        ('draw_exoplanets', frame + (config['mag'], config['scale']),
+         lambda: SkyPlotter.draw_exoplanets(fig, visible, df_exo, config)),
+        ('draw_stars', frame + (config['mag'], config['scale'], raster),
+         lambda: SkyPlotter.draw_stars(fig, visible.nsmallest(RASTER_HOVER, 'mag') if raster else visible)),
+        ('draw_planets', frame + (config['show_planet'], config['mag']),
+         lambda: SkyPlotter.draw_planets(fig, df_planets, config)),
+        ('draw_trajectory', (config.get('sel'), lat, lon, config['d'], config['mode'], config['view'],
+                             config.get('precise', False), str(local_tz), catalog),
+         lambda: SkyPlotter.draw_trajectory(fig, config, SkyEngine, df_stars,
+                                            constants.new_planets() if config.get('sel') else {}, local_tz, index)),
+        ('draw_deep_sky_images', frame + (config.get('show_images'), id(images)),
+         lambda: SkyPlotter.draw_deep_sky_images(fig, lat, lon, dt_utc, config, SkyEngine, images)),
+    ]
+    for name, key, draw in layers:
+        with rec.stage(name) as s:
+            # Filas = puntos de la capa (reutilizada o no)
+            _, s['rows'] = cache.layer(name, key, draw)
+    fig = cache.end()
+
+    _measure_payload(fig, rec)
+    return fig
+
+
+def refresh_live_layers(figures, config, dt_utc, recorder=None, images=None):
+    """Modo en vivo: redibuja solo grilla, planetas y fotos (baratas) al instante dt_utc.
+
+    Las capas fijas al cielo las rota live.LiveSky; esta función no toca el catálogo.
+    """
+    rec = recorder or StageRecorder()
+    lat, lon = config['lat'], config['lon']
+    with rec.stage('process_planets') as s:
+        df_planets = SkyEngine.process_planets(config, dt_utc, CON_ES) if config['show_planet'] else pd.DataFrame()
+        s['rows'] = len(df_planets)
+    fig = figures.fig
+    layers = [
+        ('draw_grid', lambda: SkyPlotter.draw_grid(fig, lat, lon, dt_utc, config, SkyEngine)),
+        ('draw_planets', lambda: SkyPlotter.draw_planets(fig, df_planets, config)),
+        ('draw_deep_sky_images', lambda: SkyPlotter.draw_deep_sky_images(fig, lat, lon, dt_utc, config, SkyEngine, images)),
+    ]
+    for name, draw in layers:
+        if name not in figures.layers: continue   # Capa apagada (o modo imagen sin grilla de Plotly)
+        with rec.stage(name) as s:
+            _, s['rows'] = figures.refresh(name, ('live', dt_utc), draw)
+    return fig
+
+
+def _rasterize(fig, stars_df, visible, const_data, config, dt_utc, rec):
+    """Fondo PNG con estrellas, líneas de constelaciones y grilla (ver raster.py)"""
+    from raster import render_sky
+    with rec.stage('render_sky', rows=len(visible)) as s:
+        render_sky(stars_df, visible, const_data, config, dt_utc, SkyEngine).add_to_figure(fig)
+        s['bytes'] = len(fig.layout.images[-1].source)
+
+
+def _measure_payload(fig, rec):
+    """Serializa la figura solo si se está midiendo (es tan caro como enviarla)"""
+    if not rec.enabled: return
+    with rec.stage('serialize') as s:
+        s['bytes'] = len(fig.to_json().encode())
@@ -0,0 +1,106 @@
+# profiling.py
+import os
+import sys
+import time
+import cProfile
+import datetime
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_ENV = "SKY_PROFILE"          # 1 / cprofile / sample
+PROFILE_DIR_ENV = "SKY_PROFILE_DIR"
+PROFILE_DIR = "profiles"
+MODES = ("cprofile", "sample")
+
+
+def profiling_requested(query_params=None):
+    """Modo de perfilado pedido por SKY_PROFILE o ?profile=... (None si no se pidió)"""
+    value = os.environ.get(PROFILE_ENV, "")
+    if not value and query_params:
+        value = str(query_params.get("profile", ""))
+    value = value.lower()
+    if value in ("1", "true", "yes"):
+        return "cprofile"
+    return value if value in MODES else None
+
+
+class StackSampler:
+    """Profiler por muestreo: cada 'interval' segundos toma el stack del hilo objetivo.
+
+    Acumula stacks en formato 'collapsed' (flamegraph.pl, speedscope, inferno).
+    """
+
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profile_run(session_id, mode="cprofile", out_dir=None):
+    """Perfila el bloque y guarda '<dir>/<sesión>_<fecha>.pstats' (o '.collapsed' si mode='sample').
+
+    Devuelve un dict cuyo 'path' se completa al salir.
+    """
+    out_dir = out_dir or os.environ.get(PROFILE_DIR_ENV, PROFILE_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    result = {'path': None, 'seconds': None}
+    t0 = time.perf_counter()
+    if mode == "sample":
+        sampler = StackSampler()
+        sampler.start()
+        try:
+            yield result
+        finally:
+            sampler.stop()
+            result['path'] = os.path.join(out_dir, f"{session_id}_{stamp}.collapsed")
+            sampler.dump(result['path'])
+            result['seconds'] = time.perf_counter() - t0
+    else:
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield result
+        finally:
+            prof.disable()
+            result['path'] = os.path.join(out_dir, f"{session_id}_{stamp}.pstats")
+            prof.dump_stats(result['path'])
+            result['seconds'] = time.perf_counter() - t0
+
+
+@contextmanager
+def maybe_profile(session_id, mode):
+    """profile_run si hay modo pedido; si no, no hace nada"""
+    if not mode:
+        yield None
+        return
+    with profile_run(session_id, mode) as result:
+        yield result
@@ -0,0 +1,173 @@
+# raster.py
+"""Dibujo del cielo en un buffer de numpy (sin Plotly) y exportación a PNG.
+
+Las estrellas se "salpican" con un núcleo gaussiano pesado por el flujo (10^(-0.4 m)),
+las líneas se muestrean cada medio píxel con reparto bilineal (antialias) y el PNG se
+arma a mano con zlib. El tamaño del resultado no depende de cuántas estrellas haya.
+"""
+import base64
+import struct
+import zlib
+import numpy as np
+from lazy_import import lazy_module
+
+pd = lazy_module("pandas")
+
+BACKGROUND = (5, 5, 16)       # '#050510' como el layout de Plotly
+GROUND = (10, 21, 10)         # '#0a150a', el suelo del Panorama
+PX_PER_DEG = 8
+LINE_STEP = 0.5               # Paso de muestreo de las líneas (px)
+
+
+def hex_to_rgb(colors):
+    """Serie de '#rrggbb' -> array (n, 3) en [0, 1]"""
+    codes, uniques = pd.factorize(pd.Series(colors, dtype=str))   # Pocos colores distintos (paleta espectral)
+    table = np.array([[int(c.lstrip('#')[i:i + 2], 16) for i in (0, 2, 4)] for c in uniques], dtype=np.float32)
+    return table.reshape(-1, 3)[codes] / 255.0
+
+
+def parse_rgba(color):
+    """'rgba(r,g,b,a)' / 'rgb(...)' / '#rrggbb' -> ((r, g, b) en [0, 1], alfa)"""
+    if color.startswith('#'):
+        return tuple(hex_to_rgb([color])[0]), 1.0
+    vals = [float(v) for v in color[color.index('(') + 1:color.index(')')].split(',')]
+    return tuple(v / 255.0 for v in vals[:3]), (vals[3] if len(vals) > 3 else 1.0)
+
+
+def encode_png(rgb):
+    """Array (h, w, 3) uint8 -> bytes PNG (filtro 0, zlib)"""
+    h, w, _ = rgb.shape
+    raw = np.zeros((h, w * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgb.reshape(h, w * 3)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0)) +
+            chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b""))
+
+
+class SkyRaster:
+    """Lienzo en coordenadas de pantalla del modo (Panorama: az/alt, Cenit: disco de radio 90+)"""
+
+    def __init__(self, config, px_per_deg=PX_PER_DEG):
+        if config['mode'] == "Panorama":
+            self.extent = (-180.0, 180.0, -10.0, 90.0)  # x0, x1, y0, y1
+        else:
+            self.extent = (-100.0, 100.0, -100.0, 100.0)
+        x0, x1, y0, y1 = self.extent
+        self.scale = px_per_deg
+        self.w, self.h = int((x1 - x0) * px_per_deg), int((y1 - y0) * px_per_deg)
+        self.img = np.empty((self.h, self.w, 3), dtype=np.float32)
+        self.img[:] = np.array(BACKGROUND, dtype=np.float32) / 255.0
+        if config['mode'] == "Panorama":
+            ground = int(round((y1 - 0.0) * px_per_deg))
+            self.img[ground:] = np.array(GROUND, dtype=np.float32) / 255.0
+
+    def to_pixels(self, x, y):
+        """Coordenadas del gráfico -> píxeles (float; fila 0 arriba)"""
+        x0, _, _, y1 = self.extent
+        return (np.asarray(x, dtype=np.float64) - x0) * self.scale, (y1 - np.asarray(y, dtype=np.float64)) * self.scale
+
+    @staticmethod
+    def _splat(idx, weights):
+        """Suma 'weights' (n, k) por píxel -> (píxeles tocados, sumas (m, k)); no recorre el lienzo entero"""
+        pix, inv = np.unique(idx, return_inverse=True)
+        return pix, np.column_stack([np.bincount(inv, weights=weights[:, c], minlength=len(pix))
+                                     for c in range(weights.shape[1])])
+
+    def _accumulate(self, fx, fy, weights):
+        """Reparto bilineal de 'weights' en los 4 píxeles vecinos -> (píxeles, sumas)"""
+        ix, iy = np.floor(fx).astype(np.int64), np.floor(fy).astype(np.int64)
+        tx, ty = fx - ix, fy - iy
+        idx, wts = [], []
+        for dx, dy, wt in ((0, 0, (1 - tx) * (1 - ty)), (1, 0, tx * (1 - ty)), (0, 1, (1 - tx) * ty), (1, 1, tx * ty)):
+            cx, cy = ix + dx, iy + dy
+            ok = (cx >= 0) & (cx < self.w) & (cy >= 0) & (cy < self.h)
+            idx.append(cy[ok] * self.w + cx[ok]); wts.append((weights * wt)[ok])
+        pix, acc = self._splat(np.concatenate(idx), np.concatenate(wts)[:, None])
+        return pix, acc[:, 0]
+
+    def draw_segments(self, x0, y0, x1, y1, color, width=1.0):
+        """Segmentos con antialias (muestreo cada LINE_STEP px), compuestos con el alfa del color"""
+        rgb, alpha = parse_rgba(color)
+        ax, ay = self.to_pixels(x0, y0)
+        bx, by = self.to_pixels(x1, y1)
+        ok = np.isfinite(ax) & np.isfinite(ay) & np.isfinite(bx) & np.isfinite(by)
+        ax, ay, bx, by = ax[ok], ay[ok], bx[ok], by[ok]
+        if not len(ax): return
+        counts = np.maximum(np.ceil(np.hypot(bx - ax, by - ay) / LINE_STEP).astype(np.int64), 1) + 1
+        seg = np.repeat(np.arange(len(ax)), counts)
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        t = (np.arange(len(seg)) - first) / np.repeat(counts - 1, counts)
+        fx, fy = ax[seg] + (bx - ax)[seg] * t, ay[seg] + (by - ay)[seg] * t
+        pix, cover = self._accumulate(fx, fy, np.full(len(fx), LINE_STEP * width))
+        flat = self.img.reshape(-1, 3)
+        cover = (np.minimum(cover, 1.0) * alpha).astype(np.float32)[:, None]
+        flat[pix] += (np.array(rgb, dtype=np.float32) - flat[pix]) * cover
+
+    def draw_polyline(self, x, y, color, width=1.0):
+        """Polilínea con cortes NaN (como las de grid.py)"""
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        if len(x) < 2: return
+        self.draw_segments(x[:-1], y[:-1], x[1:], y[1:], color, width)
+
+    def draw_stars(self, x, y, mag, colors, mag_lim):
+        """Splatting gaussiano: amplitud y radio crecen con el flujo relativo al límite"""
+        if not len(x): return
+        fx, fy = self.to_pixels(x, y)
+        flux = 10 ** (-0.4 * (np.asarray(mag, dtype=np.float64) - mag_lim))
+        amp = np.clip(0.35 * flux ** 0.4, 0.12, 1.5)
+        sigma = 0.45 + 0.35 * np.log10(np.maximum(flux, 1.0))
+        rgb = hex_to_rgb(colors)
+        all_idx, all_w = [], []
+        radius = np.ceil(2.5 * sigma).astype(np.int64)
+        # Un núcleo por radio: pocos grupos, todo vectorizado dentro de cada uno
+        for r in np.unique(radius):
+            sel = radius == r
+            offs = np.arange(-r, r + 1)
+            ox, oy = (a.ravel() for a in np.meshgrid(offs, offs))
+            px_, py_ = fx[sel][:, None] + ox, fy[sel][:, None] + oy
+            cx, cy = np.round(px_).astype(np.int64), np.round(py_).astype(np.int64)
+            d2 = (cx - fx[sel][:, None]) ** 2 + (cy - fy[sel][:, None]) ** 2
+            wgt = amp[sel][:, None] * np.exp(-d2 / (2 * sigma[sel][:, None] ** 2))
+            ok = (cx >= 0) & (cx < self.w) & (cy >= 0) & (cy < self.h)
+            all_idx.append((cy * self.w + cx)[ok])
+            all_w.append(np.stack([(wgt * rgb[sel][:, ch:ch + 1])[ok] for ch in range(3)], axis=1))
+        pix, light = self._splat(np.concatenate(all_idx), np.concatenate(all_w))
+        # Saturación suave: las brillantes no "queman" en blanco de golpe
+        flat = self.img.reshape(-1, 3)
+        flat[pix] = 1 - (1 - flat[pix]) * np.exp(-light).astype(np.float32)
+
+    def to_png(self):
+        return encode_png((np.clip(self.img, 0, 1) * 255 + 0.5).astype(np.uint8))
+
+    def data_uri(self):
+        return "data:image/png;base64," + base64.b64encode(self.to_png()).decode('ascii')
+
+    def add_to_figure(self, fig):
+        """Pone el PNG de fondo, alineado con los ejes de la figura"""
+        x0, x1, y0, y1 = self.extent
+        fig.add_layout_image(dict(source=self.data_uri(), xref="x", yref="y", x=x0, y=y1,
+                                  sizex=x1 - x0, sizey=y1 - y0, sizing="stretch", layer="below"))
+
+
+def render_sky(stars_df, visible, const_data, config, dt_utc, engine, px_per_deg=PX_PER_DEG):
+    """Estrellas visibles, líneas de constelaciones y grilla en un SkyRaster"""
+    from grid import LAYERS, DEFAULT_LAYERS
+    raster = SkyRaster(config, px_per_deg)
+    if config['show_grid']:
+        for kind in config.get('grid_layers', DEFAULT_LAYERS):
+            gx, gy = engine.get_grid_line(config['lat'], config['lon'], dt_utc, config, kind)
+            raster.draw_polyline(gx, gy, LAYERS[kind][1])
+    if config['show_const'] and const_data:
+        # Mismo criterio que SkyPlotter.draw_constellations, pero con arrays
+        stars = stars_df[stars_df['hip'].notna() & (stars_df['alt'] > -20)].drop_duplicates('hip').set_index('hip')
+        pairs = np.array([p for c in const_data for p in c['pairs']], dtype=np.float64).reshape(-1, 2)
+        a = stars[['px', 'py']].reindex(pairs[:, 0]).to_numpy()
+        b = stars[['px', 'py']].reindex(pairs[:, 1]).to_numpy()
+        near = np.abs(a[:, 0] - b[:, 0]) < 120 if config['mode'] == "Panorama" else np.ones(len(a), bool)
+        raster.draw_segments(a[near, 0], a[near, 1], b[near, 0], b[near, 1], 'rgba(100,200,255,0.35)')
+    raster.draw_stars(visible['px'].to_numpy(), visible['py'].to_numpy(), visible['mag'].to_numpy(),
+                      visible['color'], config['mag'])
+    return raster
@@ -0,0 +1,165 @@
+# search_index.py
+"""Índice de búsqueda de estrellas: nombres, HIP, Bayer/Flamsteed y constelación en español.
+
+Se arma una sola vez por catálogo. Las consultas por prefijo usan bisect sobre los
+términos ordenados; si no alcanzan, se completa con búsqueda difusa por trigramas.
+"""
+from bisect import bisect_left
+import numpy as np
+from lazy_import import lazy_module
+from star_index import normalize_name
+from constants import CON_ES
+
+pd = lazy_module("pandas")
+
+# Abreviatura de Bayer en HYG -> (nombre en español, letra griega)
+GREEK = {
+    'Alp': ('alfa', 'α'), 'Bet': ('beta', 'β'), 'Gam': ('gamma', 'γ'), 'Del': ('delta', 'δ'),
+    'Eps': ('epsilon', 'ε'), 'Zet': ('zeta', 'ζ'), 'Eta': ('eta', 'η'), 'The': ('theta', 'θ'),
+    'Iot': ('iota', 'ι'), 'Kap': ('kappa', 'κ'), 'Lam': ('lambda', 'λ'), 'Mu': ('mu', 'μ'),
+    'Nu': ('nu', 'ν'), 'Xi': ('xi', 'ξ'), 'Omi': ('omicron', 'ο'), 'Pi': ('pi', 'π'),
+    'Rho': ('rho', 'ρ'), 'Sig': ('sigma', 'σ'), 'Tau': ('tau', 'τ'), 'Ups': ('upsilon', 'υ'),
+    'Phi': ('phi', 'φ'), 'Chi': ('chi', 'χ'), 'Psi': ('psi', 'ψ'), 'Ome': ('omega', 'ω'),
+}
+
+EXACT, PREFIX = 3.0, 2.0     # Puntaje; lo difuso va de 0 a 1
+FUZZY_MIN = 0.45             # Coeficiente de Dice mínimo entre trigramas
+PREFIX_SCAN = 5000           # Tope de términos recorridos por prefijo (consultas de 1-2 letras)
+
+
+def _trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Búsqueda con ranking: exacto > prefijo > difuso y, a igual puntaje, la más brillante"""
+
+    def __init__(self, df_stars, extra=()):
+        """'extra': nombres que no son estrellas del catálogo (ej. planetas); se devuelven tal cual"""
+        self.names = df_stars['proper_clean'].to_numpy()
+        self.mag = df_stars['mag'].to_numpy(dtype=np.float64)
+        self.extra = list(extra)
+        self._labels = {}
+        n = len(df_stars)
+        # Designaciones para las etiquetas ('α Ori', '58 Ori', 'HIP 27989')
+        self._desig = [[] for _ in range(n)]
+        terms, rows, fuzzy = [], [], []
+
+        def add(values, row_ids, searchable=False):
+            values = pd.Series(values, dtype=object)
+            ok = values.notna().to_numpy()
+            terms.extend(values[ok].tolist()); rows.extend(np.asarray(row_ids)[ok].tolist())
+            fuzzy.extend([searchable] * int(ok.sum()))
+
+        all_rows = np.arange(n)
+        con = df_stars['con'].fillna('').str.lower()
+        # Nombre en español desde CON_ES ('Orión' -> 'orion'): 'con_es' del catálogo pasó por
+        # deep_clean, que borra las letras acentuadas ('Orin')
+        con_es = df_stars['con'].map(CON_ES).fillna(df_stars['con']).fillna('')
+        con_es = con_es.map({c: normalize_name(c) for c in con_es.unique()})  # 88 valores distintos
+
+        proper = df_stars['proper']
+        named = proper.notna().to_numpy()
+        add(proper[named].map(normalize_name), all_rows[named], searchable=True)
+
+        hip = pd.to_numeric(df_stars['hip'], errors='coerce')
+        has_hip = hip.notna().to_numpy()
+        hip_txt = hip[has_hip].astype(np.int64).astype(str)
+        add("hip " + hip_txt, all_rows[has_hip])
+        add(hip_txt, all_rows[has_hip])
+        con_abbr = df_stars['con'].fillna('').to_numpy()
+
+        if 'bayer' in df_stars.columns:
+            # 'Alp', o con superíndice 'Alp-1' / 'Alp1'
+            parts = df_stars['bayer'].fillna('').astype(str).str.extract(r'^([A-Z][a-z]+)-?(\d*)$')
+            letter, sup = parts[0].fillna(''), parts[1].fillna('')
+            has = letter.isin(list(GREEK)).to_numpy()
+            word = letter.map({b: w for b, (w, _) in GREEK.items()}).fillna('') + sup
+            greek = letter.map({b: g for b, (_, g) in GREEK.items()}).fillna('') + sup
+            add((word + " " + con_es)[has], all_rows[has], searchable=True)   # alfa orion
+            add((con_es + " " + word)[has], all_rows[has], searchable=True)   # orion alfa
+            add((letter.str.lower() + sup + " " + con)[has], all_rows[has])   # alp ori
+            add((greek + " " + con)[has], all_rows[has])                      # α ori
+            for r, g in zip(all_rows[has], greek[has]):
+                self._desig[r].append(f"{g} {con_abbr[r]}")
+
+        if 'flam' in df_stars.columns:
+            flam = pd.to_numeric(df_stars['flam'], errors='coerce')
+            has = flam.notna().to_numpy()
+            num = flam[has].astype(np.int64).astype(str)
+            add(num + " " + con[has], all_rows[has])                          # 58 ori
+            add(num + " " + con_es[has], all_rows[has], searchable=True)      # 58 orion
+            for r, f in zip(all_rows[has], num):
+                self._desig[r].append(f"{f} {con_abbr[r]}")
+        for r, h in zip(all_rows[has_hip], hip_txt):
+            self._desig[r].append(f"HIP {h}")
+
+        for i, name in enumerate(self.extra):
+            add([normalize_name(name)], [-(i + 1)], searchable=True)
+
+        order = sorted(range(len(terms)), key=terms.__getitem__)
+        self.terms = [terms[i] for i in order]
+        self.rows = np.array([rows[i] for i in order], dtype=np.int64)
+
+        # Trigramas solo de nombres y designaciones (los números no se buscan en forma difusa)
+        self._fuzzy_ids = np.array([j for j, i in enumerate(order) if fuzzy[i]], dtype=np.int64)
+        postings = {}
+        for j in self._fuzzy_ids:
+            for g in _trigrams(self.terms[j]):
+                postings.setdefault(g, []).append(j)
+        self._postings = {g: np.array(v, dtype=np.int64) for g, v in postings.items()}
+        self._n_grams = np.zeros(len(self.terms), dtype=np.int64)
+        self._n_grams[self._fuzzy_ids] = [len(_trigrams(self.terms[j])) for j in self._fuzzy_ids]
+
+    def _prefix(self, q):
+        i = bisect_left(self.terms, q)
+        end = min(i + PREFIX_SCAN, len(self.terms))
+        j = i
+        while j < end and self.terms[j].startswith(q):
+            j += 1
+        return np.arange(i, j)
+
+    def _fuzzy(self, q):
+        grams = [self._postings[g] for g in _trigrams(q) if g in self._postings]
+        if not grams: return np.array([], dtype=np.int64), np.array([])
+        common = np.bincount(np.concatenate(grams), minlength=len(self.terms))
+        cand = np.flatnonzero(common)
+        dice = 2 * common[cand] / (len(_trigrams(q)) + self._n_grams[cand])
+        keep = dice >= FUZZY_MIN
+        return cand[keep], dice[keep]
+
+    def search(self, query, limit=20):
+        """Lista de (valor para 'sel', etiqueta) ordenada por relevancia"""
+        q = normalize_name(query)
+        if not q: return []
+        ids = self._prefix(q)
+        scores = np.where(np.array([self.terms[i] == q for i in ids], dtype=bool), EXACT, PREFIX)
+        if len(np.unique(self.rows[ids])) < limit:
+            f_ids, f_scores = self._fuzzy(q)
+            ids, scores = np.concatenate((ids, f_ids)), np.concatenate((scores, f_scores))
+        if not len(ids): return []
+
+        rows = self.rows[ids]
+        mag = np.where(rows >= 0, self.mag[np.maximum(rows, 0)], -30.0)   # Planetas primero a igual puntaje
+        order = np.lexsort((mag, -scores))
+        seen, out = set(), []
+        for k in order:
+            row = int(rows[k])
+            if row in seen: continue
+            seen.add(row)
+            out.append((self.value(row), self.label(row)))
+            if len(out) >= limit: break
+        return out
+
+    def value(self, row):
+        return self.extra[-row - 1] if row < 0 else self.names[row]
+
+    def label(self, row):
+        """'Betelgeuse · α Ori · 58 Ori · HIP 27989 · mag 0.45'"""
+        if row < 0: return self.extra[-row - 1]
+        label = self._labels.get(row)
+        if label is None:
+            label = " · ".join([self.names[row]] + self._desig[row] + [f"mag {self.mag[row]:.2f}"])
+            self._labels[row] = label
+        return label
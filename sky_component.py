@@ -0,0 +1,99 @@
+# sky_component.py
+"""Cielo proyectado en el navegador (componente propio en components/sky_projection).
+
+El catálogo viaja una sola vez como arrays binarios por la ruta estática (el navegador
+lo cachea); en cada rerun solo se mandan observador, hora y planetas. Mover la vista,
+el zoom o pasar de Panorama a Cenit se resuelve en el cliente, sin volver a Python.
+Usa el modelo simple de SkyEngine (sin precesión ni refracción).
+"""
+import os
+import base64
+import hashlib
+import numpy as np
+from lazy_import import lazy_module
+from image_cache import static_serving_enabled
+from photometry import StarPhotometry
+from raster import hex_to_rgb
+
+st = lazy_module("streamlit")
+pd = lazy_module("pandas")
+
+COMPONENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "sky_projection")
+
+_component = None
+
+
+def _declare():
+    global _component
+    if _component is None:
+        import streamlit.components.v1 as components
+        _component = components.declare_component("sky_projection", path=COMPONENT_DIR)
+    return _component
+
+
+class CatalogAsset:
+    """Catálogo para el componente: [ra, dec (rad), mag] float32 | id int32 | pares int32 | rgb uint8"""
+    ASSET_DIR = os.path.join("static", "sky")
+    STATIC_URL = "app/static/sky"
+
+    def __init__(self, df_stars, const_data=(), static_route=None, photometry=None):
+        self.n = len(df_stars)
+        ra = np.radians(df_stars['ra'].to_numpy(dtype=np.float64) * 15)
+        dec = np.radians(df_stars['dec'].to_numpy(dtype=np.float64))
+        mag = df_stars['mag'].to_numpy(dtype=np.float64)
+        ids = df_stars['id'].to_numpy(dtype=np.int64)
+        # Mismos colores que los puntos de Plotly (tipo espectral o B-V)
+        photometry = photometry or StarPhotometry(df_stars)
+        rgb = (hex_to_rgb(photometry.color) * 255 + 0.5).astype(np.uint8)
+
+        # Pares HIP de las constelaciones -> filas del catálogo
+        rows = pd.Series(np.arange(self.n), index=df_stars['hip'])
+        rows = rows[rows.index.notna() & ~rows.index.duplicated()]
+        pairs = np.array([p for c in const_data for p in c['pairs']], dtype=np.float64).reshape(-1, 2)
+        a, b = rows.reindex(pairs[:, 0]).to_numpy(), rows.reindex(pairs[:, 1]).to_numpy()
+        ok = ~(np.isnan(a) | np.isnan(b))
+        pairs = np.column_stack((a[ok], b[ok])).astype(np.int32)
+        self.m = len(pairs)
+
+        self.payload = b"".join((np.concatenate((ra, dec, mag)).astype('<f4').tobytes(), ids.astype('<i4').tobytes(),
+                                 pairs.astype('<i4').tobytes(), rgb.tobytes()))
+        self.version = hashlib.sha1(self.payload).hexdigest()[:12]
+        self.static_route = static_serving_enabled() if static_route is None else static_route
+
+    def path(self):
+        return os.path.join(self.ASSET_DIR, f"catalog_{self.version}.bin")
+
+    def source(self):
+        """Descripción para el componente: URL estática (se escribe una vez) o, sin servidor, base64"""
+        src = {'version': self.version, 'n': self.n, 'm': self.m}
+        if self.static_route:
+            if not os.path.exists(self.path()):
+                os.makedirs(self.ASSET_DIR, exist_ok=True)
+                tmp = self.path() + ".tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(self.payload)
+                os.replace(tmp, self.path())
+            src['url'] = f"{self.STATIC_URL}/catalog_{self.version}.bin"
+        else:
+            src['data'] = base64.b64encode(self.payload).decode('ascii')   # Viaja en cada rerun
+        return src
+
+
+def sky_projection(asset, config, dt_utc, df_planets=None, sel_id=None, key="sky_projection", height=950):
+    """Dibuja el cielo en el navegador. Devuelve {'customdata': id o planeta} de un clic nuevo, o None"""
+    planets = []
+    if df_planets is not None and not df_planets.empty:
+        planets = [{'name': r.Nombre, 'alt': float(r.alt), 'az': float(r.az_real), 'color': r.color, 'size': r.size}
+                   for r in df_planets.itertuples()]
+    value = _declare()(
+        catalog=asset.source(),
+        observer={'lat': config['lat'], 'lon': config['lon'], 'time': dt_utc.timestamp() * 1000},
+        view=config['view'], fov=config['fov'], mode=config['mode'], mag=config['mag'], scale=config['scale'],
+        show_const=config['show_const'], planets=planets, sel_id=None if sel_id is None else int(sel_id),
+        height=height, key=key, default=None)
+    # El valor del componente persiste entre reruns: solo cuenta un clic que no se haya visto
+    seen = st.session_state.get(f"{key}_seq", 0)
+    if not value or value.get('seq', 0) <= seen:
+        return None
+    st.session_state[f"{key}_seq"] = value['seq']
+    return value
@@ -1,12 +1,20 @@
 # sky_plotter.py
-from constants import MESSIER_OBJ, PLANETS, MESSIER_IMAGES
-import plotly.graph_objects as go
+from constants import MESSIER_IMAGES
 import numpy as np
 import datetime
+import logging
 from styles import get_plotly_layout
-import streamlit as st
-import pandas as pd
-import ephem
+from lazy_import import lazy_module
+from astrometry import LY_PER_PC
+from photometry import absolute_magnitude, luminosity_size, star_colors
+
+go = lazy_module("plotly.graph_objects")
+pd = lazy_module("pandas")
+ephem = lazy_module("ephem")
+
+logger = logging.getLogger(__name__)
+
+BG_DIM = 0.7   # Las estrellas de fondo (sin tooltip) van un poco más tenues
 
 class SkyPlotter:
     @staticmethod
@@ -22,8 +30,20 @@ class SkyPlotter:
 
 
     @staticmethod
-    def draw_constellations(fig, stars_df, const_data, config):
-        """Dibuja líneas y nombres de constelaciones"""
+    def draw_grid(fig, lat, lon, dt_utc, config, engine):
+        """Dibuja las capas de grilla elegidas (eclíptica, ecuador, AR/Dec, galáctico, alt/az)"""
+        if not config['show_grid']: return
+        from grid import LAYERS, DEFAULT_LAYERS
+        for kind in config.get('grid_layers', DEFAULT_LAYERS):
+            name, color, dash = LAYERS[kind]
+            gx, gy = engine.get_grid_line(lat, lon, dt_utc, config, kind)
+            fig.add_trace(go.Scatter(x=gx, y=gy, mode='lines', line=dict(color=color, dash=dash, width=1),
+                                     name=name, hoverinfo='skip', connectgaps=False))
+
+
+    @staticmethod
+    def draw_constellations(fig, stars_df, const_data, config, lines=True):
+        """Dibuja líneas y nombres de constelaciones (lines=False: solo nombres, las líneas van en el raster)"""
         if not config['show_const']: return
         
         # Mapa de coordenadas para las líneas
@@ -43,7 +63,8 @@ class SkyPlotter:
             if c_pxs and np.mean(c_pys) > (5 if config['mode'] == "Panorama" else -85):
                 cnx.append(np.mean(c_pxs)); cny.append(np.mean(c_pys)); cnt.append(c['name_es'])
         
-        fig.add_trace(go.Scattergl(x=lx, y=ly, mode='lines', line=dict(color='rgba(100,200,255,0.15)', width=1), hoverinfo='skip'))
+        if lines:
+            fig.add_trace(go.Scattergl(x=lx, y=ly, mode='lines', line=dict(color='rgba(100,200,255,0.15)', width=1), hoverinfo='skip'))
         fig.add_trace(go.Scattergl(x=cnx, y=cny, mode='text', text=cnt, textfont=dict(color='rgba(150,180,255,0.4)', size=15), hoverinfo='skip'))
 
 
@@ -61,7 +82,7 @@ class SkyPlotter:
         
         # Estrellas con información
         df_info = df_sorted.head(n_info).copy()
-        print(df_info.columns.tolist())
+        logger.debug("draw_stars: %d con tooltip, columnas %s", len(df_info), df_info.columns.tolist())
         h_text = ("<b>" + df_info['proper_clean'] + "("+ df_info['rank_brillo'].astype(str) + ")</b><br>" +
                   "Const: " + df_info['con_es'] + "<br>" +
                   "Dist: " + df_info['dist_ly'].map('{:.1f} ly'.format) + "<br>" +
@@ -72,7 +93,7 @@ class SkyPlotter:
             x=df_info['px'], y=df_info['py'], mode='markers',
             text=h_text, hoverinfo='text',            
             customdata=df_info['id'],
-            marker=dict(size=df_info['size'], color=df_info['color'], opacity=0.9,  
+            marker=dict(size=df_info['size'], color=df_info['color'], opacity=df_info['opacity'],  
                 line=dict(
                 width=0.5, 
                 color='rgba(255, 255, 255, 0.2)' # Un borde casi invisible que simula un pequeño brillo
@@ -85,7 +106,7 @@ class SkyPlotter:
             fig.add_trace(go.Scattergl(
                 x=df_bg['px'], y=df_bg['py'], mode='markers',
                 hoverinfo='none', # Esto ahorra muchísimo tamaño en el JSON
-                marker=dict(size=df_bg['size'], color=df_bg['color'], opacity=0.6, line=dict(width=0))
+                marker=dict(size=df_bg['size'], color=df_bg['color'], opacity=df_bg['opacity'] * BG_DIM, line=dict(width=0))
             ))
 
 
@@ -132,9 +153,9 @@ class SkyPlotter:
 
 
     @staticmethod
-    def draw_trajectory(fig, config, engine, df_stars_all, planet_objs, local_tz):
+    def draw_trajectory(fig, config, engine, df_stars_all, planet_objs, local_tz, index=None):
     #def draw_trajectory_OLS(fig, config, engine, df_stars_all, local_tz):
-        """Dibuja el arco amarillo (CORREGIDO)"""
+        """Dibuja el arco amarillo. planet_objs: {nombre: cuerpo ephem}; index: StarIndex opcional"""
         sel = config.get('sel')
         if not sel: return
         
@@ -144,7 +165,12 @@ class SkyPlotter:
         is_planet = sel in planet_objs
         star_row = None
         
-        if not is_planet:
+        if not is_planet and index is not None:
+            # id o nombre -> fila en O(1)
+            row = index.row(sel)
+            if row is None: return
+            star_row = df_stars_all.iloc[row]
+        elif not is_planet:
             # Buscamos en el catálogo. Probamos por ID primero, luego por nombre
             found = df_stars_all[df_stars_all['id'] == sel]
             if found.empty:
@@ -166,7 +192,8 @@ class SkyPlotter:
                 p_o.compute(obs)
                 p_alt, p_az = np.degrees(p_o.alt), np.degrees(p_o.az)
             else:
-                p_alt, p_az = engine.get_alt_az(star_row['ra'], star_row['dec'], config['lat'], config['lon'], dt_c)
+                p_alt, p_az = engine.get_alt_az(star_row['ra'], star_row['dec'], config['lat'], config['lon'], dt_c,
+                                                 precise=config.get('precise', False))
             
             if p_alt > 0:
                 cx, cy = engine.transform(p_az, p_alt, config)
@@ -185,23 +212,28 @@ class SkyPlotter:
 
                 
     @staticmethod
-    def draw_messier(fig, lat, lon, dt_utc, config, engine):
-        
-        if not config['show_mess']: return
-        """Dibuja objetos de cielo profundo (Galaxias, Nebulosas)"""
-        #if not config.get('show_messier', True): return
-        
-        m_x, m_y, m_text = [], [], []
-        for code, data in MESSIER_OBJ.items():
-            alt, az = engine.get_alt_az(data[0], data[1], lat, lon, dt_utc)
-            if alt > 0:
-                x, y = engine.transform(az, alt, config)
-                m_x.append(x); m_y.append(y)
-                m_text.append(f"<b>{code}</b><br>{data[2]}")
-        
+    def draw_messier(fig, lat, lon, dt_utc, config, engine, deep_sky=None):
+        """Dibuja objetos de cielo profundo: Messier con etiqueta, NGC/IC solo marcador"""
+        if not config['show_mess'] or deep_sky is None or deep_sky.empty: return
+
+        # Messier siempre; el resto según su brillo (los que no tienen magnitud se muestran)
+        dso = deep_sky[deep_sky['is_messier'] | ~(deep_sky['mag'] > config.get('dso_mag', 8.0))]
+        # Una sola llamada vectorizada para todo el catálogo
+        alt, az = engine.get_alt_az(dso['ra'].to_numpy(), dso['dec'].to_numpy(), lat, lon, dt_utc,
+                                    precise=config.get('precise', False))
+        up = alt > 0
+        px, py = engine.transform(az[up], alt[up], config)
+        dso = dso[up]
+        messier = dso['is_messier'].to_numpy()
+
+        fig.add_trace(go.Scattergl(
+            x=px[~messier], y=py[~messier], mode='markers',
+            hovertext=dso['hover'][~messier], hoverinfo='text',
+            marker=dict(symbol='diamond-open', size=6, color='rgba(0,255,255,0.5)'), name='NGC/IC'
+        ))
         fig.add_trace(go.Scattergl(
-            x=m_x, y=m_y, mode='markers+text', text=[c.split('<')[0] for c in m_text],
-            hovertext=m_text, hoverinfo='text', textposition="bottom center",
+            x=px[messier], y=py[messier], mode='markers+text', text=dso['code'][messier],
+            hovertext=dso['hover'][messier], hoverinfo='text', textposition="bottom center",
             marker=dict(symbol='diamond', size=10, color='#00ffff'),
             textfont=dict(color='#00ffff', size=12), name='Messier'
         ))
@@ -215,7 +247,9 @@ class SkyPlotter:
         # 4. CAPA DE EXOPLANETAS: Resaltar estrellas que tienen planetas
         #if config.get('show_exo') and not exo_df.empty:
             
-        df_exo_vis = stars_df.merge(exo_df, on='hip', how='inner')
+        if exo_df.empty: return
+        # Sin dropna, NaN cruza con NaN y el merge explota (igual que en draw_galactic_cube)
+        df_exo_vis = stars_df.dropna(subset=['hip']).merge(exo_df.dropna(subset=['hip']), on='hip', how='inner')
         
         # Si no encontró nada por ID, intentamos por NOMBRE (como Proxima Centauri)
         if df_exo_vis.empty:
@@ -247,12 +281,12 @@ class SkyPlotter:
         
 
 
-    def draw_galactic_cube(df_stars, const_data, exo_df, config, engine):
+    def draw_galactic_cube(df_stars, const_data, exo_df, config, engine, index=None):
         # 1. Procesar el universo centrado en la selección
         show_g = config.get('show_grid', False)
         target = config.get('sel')
         dist_max = config.get('dist_max', 50)
-        df_trans, sol_rel = engine.get_translated_universe(df_stars, target)
+        df_trans, sol_rel = engine.get_translated_universe(df_stars, target, index)
         
         # 2. Filtrar por radio de visión y brillo
         mask = (df_trans['x']**2 + df_trans['y']**2 + df_trans['z']**2)**0.5 <= dist_max
@@ -290,7 +324,10 @@ class SkyPlotter:
             hovertext=h_text,
             hoverinfo='text+name',
             customdata=df_plot['proper_clean'],
-            marker=dict(size=config['scale']*1.5, color=df_plot['spect'].map(engine.get_spectral_color), opacity=0.9)
+            # Tamaño por luminosidad (magnitud absoluta), no por brillo visto desde la Tierra
+            marker=dict(size=luminosity_size(absolute_magnitude(df_plot['mag'], df_plot['dist_ly'] / LY_PER_PC),
+                                             config['scale']),
+                        color=star_colors(df_plot['spect'], df_plot['ci']), opacity=0.9)
         ))
 
         df_plot['hip'] = pd.to_numeric(df_plot['hip'], errors='coerce')
@@ -366,23 +403,25 @@ class SkyPlotter:
         return fig
       
     @staticmethod
-    def draw_deep_sky_images(fig, lat, lon, dt_utc, config, engine):
-        """Dibuja fotos reales de nebulosas y galaxias en el mapa"""
+    def draw_deep_sky_images(fig, lat, lon, dt_utc, config, engine, images=None):
+        """Dibuja fotos reales de nebulosas y galaxias en el mapa (miniaturas locales si hay ImageCache)"""
         if not config.get('show_images', True): return
-        
-        for code, data in MESSIER_IMAGES.items():
-            ra, dec, url, size = data
-            alt, az = engine.get_alt_az(ra, dec, lat, lon, dt_utc)
-            
+
+        codes = list(MESSIER_IMAGES)
+        ra, dec, _, sizes = (np.array(col) for col in zip(*MESSIER_IMAGES.values()))
+        alts, azs = engine.get_alt_az(ra.astype(float), dec.astype(float), lat, lon, dt_utc,
+                                      precise=config.get('precise', False))
+        for code, alt, az, size in zip(codes, alts, azs, sizes.astype(float)):
             # Solo si está sobre el horizonte
             if alt > 0:
                 px, py = engine.transform(az, alt, config)
+                source = images.source(code) if images is not None else MESSIER_IMAGES[code][2]
                 
                 # Agregamos la imagen como un "layout image"
                 # sizing='contain' para que no se deforme
                 fig.add_layout_image(
                     dict(
-                        source=url,
+                        source=source,
                         xref="x", yref="y",
                         x=px, y=py,
                         sizex=size, sizey=size, # Tamaño en grados
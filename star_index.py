@@ -0,0 +1,110 @@
+# star_index.py
+"""Índices del catálogo para resolver clics, búsquedas y el warp 3D sin recorrer el DataFrame.
+
+Todas las filas son posicionales (df.iloc), las mismas que usan SkyKernel y EpochPropagator.
+"""
+import threading
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+from engine import SkyEngine
+from lazy_import import lazy_module
+
+pd = lazy_module("pandas")
+
+
+def _kdtree_class():
+    """cKDTree de scipy si está instalado (opcional); si no, None"""
+    try:
+        from scipy.spatial import cKDTree
+        return cKDTree
+    except ImportError:
+        return None
+
+
+def normalize_name(name):
+    """'Alfa Centauri ' -> 'alfa centauri' (sin tildes ni mayúsculas)"""
+    text = unicodedata.normalize('NFKD', str(name))
+    return " ".join("".join(c for c in text if not unicodedata.combining(c)).casefold().split())
+
+
+class NearestIndex:
+    """Vecino más cercano en 2D o 3D: cKDTree (O(log n)) o, sin scipy, búsqueda lineal en numpy"""
+
+    def __init__(self, points, rows=None):
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        self.rows = np.arange(len(self.points)) if rows is None else np.asarray(rows)
+        tree_cls = _kdtree_class()
+        self._tree = tree_cls(self.points) if tree_cls is not None and len(self.points) else None
+
+    def query(self, point, max_dist=np.inf):
+        """Fila del punto más cercano (o None si no hay ninguno a menos de max_dist)"""
+        if not len(self.points): return None
+        if self._tree is not None:
+            dist, i = self._tree.query(point, distance_upper_bound=max_dist)
+            return None if not np.isfinite(dist) else int(self.rows[i])
+        d2 = ((self.points - np.asarray(point, dtype=np.float64)) ** 2).sum(axis=1)
+        i = int(np.argmin(d2))
+        return int(self.rows[i]) if d2[i] <= max_dist ** 2 else None
+
+
+class StarIndex:
+    """id -> fila, nombre normalizado -> fila y árbol 3D (años luz) del catálogo por época"""
+    SPACES_KEPT = 4   # Épocas con árbol 3D guardado
+
+    def __init__(self, df_stars):
+        self.n = len(df_stars)
+        self.ids = df_stars['id'].to_numpy()
+        self.names = df_stars['proper_clean'].to_numpy()
+        self._by_id = dict(zip(self.ids.astype(np.int64).tolist(), range(self.n)))
+        # normalize_name vectorizado: los nombres ASCII (casi todos, 'HIP...') solo pasan a minúsculas
+        names = pd.Series(self.names, dtype=str)
+        norm = names.str.lower().str.replace(r'\s+', ' ', regex=True).str.strip()
+        accented = ~names.str.isascii()
+        norm[accented] = names[accented].map(normalize_name)
+        # Si dos estrellas comparten nombre gana la más brillante
+        order = np.argsort(df_stars['mag'].to_numpy(), kind='stable')
+        first = ~norm.iloc[order].duplicated().to_numpy()
+        self._by_name = dict(zip(norm.iloc[order[first]].tolist(), order[first].tolist()))
+        self.xyz = np.column_stack(SkyEngine.get_galactic_3d(df_stars['ra'].to_numpy(), df_stars['dec'].to_numpy(),
+                                                             df_stars['dist_ly'].to_numpy()))
+        self._spaces = OrderedDict()   # época -> NearestIndex del cubo 3D
+        self._lock = threading.Lock()   # Una instancia compartida entre sesiones (cache_resource)
+
+    def row(self, key):
+        """Fila para un id (número o texto numérico) o un nombre; None si no existe"""
+        if key is None or (isinstance(key, float) and np.isnan(key)): return None
+        if isinstance(key, (int, float, np.integer, np.floating)):
+            return self._by_id.get(int(key))
+        key = str(key).strip()
+        if key.isdigit():
+            return self._by_id.get(int(key))
+        return self._by_name.get(normalize_name(key))
+
+    def label(self, row):
+        """Clave estable para session_state.sel"""
+        return self.names[row]
+
+    def space(self, epoch=0.0, ra=None, dec=None, dist_ly=None):
+        """Árbol 3D en la época: J2000 (epoch 0) o las posiciones propagadas (EpochPropagator.at)"""
+        with self._lock:
+            if epoch in self._spaces:
+                self._spaces.move_to_end(epoch)
+                return self._spaces[epoch]
+            xyz = self.xyz if epoch == 0 or ra is None else \
+                np.column_stack(SkyEngine.get_galactic_3d(ra, dec, dist_ly))
+            space = self._spaces[epoch] = NearestIndex(np.nan_to_num(xyz, nan=1e12))
+            if len(self._spaces) > self.SPACES_KEPT:
+                self._spaces.popitem(last=False)
+            return space
+
+    def nearest_3d(self, x, y, z, center=(0.0, 0.0, 0.0), max_dist=np.inf, space=None):
+        """Estrella más cercana a (x, y, z) en el cubo trasladado a 'center' ('space': árbol de la época)"""
+        space = self.space() if space is None else space
+        return space.query((x + center[0], y + center[1], z + center[2]), max_dist)
+
+    @staticmethod
+    def screen_index(px, py, mask):
+        """NearestIndex sobre la proyección actual (solo las filas de 'mask')"""
+        rows = np.flatnonzero(mask)
+        return NearestIndex(np.column_stack((px[rows], py[rows])), rows)
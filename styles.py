@@ -1,5 +1,7 @@
 # styles.py
-import streamlit as st
+from lazy_import import lazy_module
+
+st = lazy_module("streamlit")
 
 def apply_custom_css():
     """Limpia los márgenes y fija el botón de configuración sin romper el menú"""
@@ -117,7 +119,9 @@ def get_plotly_layout(config):
             font_family="Arial",
             namelength=-1  # <--- ESTO EVITA QUE EL TEXTO SE CORTE CON "..."
         ),
-        dragmode='zoom' # Habilitamos el modo recuadro por defecto
+        dragmode='zoom', # Habilitamos el modo recuadro por defecto
+        # Mientras no cambien modo/vista/zoom, Plotly conserva el zoom del usuario entre reruns
+        uirevision=f"{config['mode']}|{config.get('view')}|{config.get('fov')}"
     )
     
     if config['mode'] == "Panorama":
@@ -0,0 +1,76 @@
+# synthetic.py
+"""Catálogos sintéticos con las columnas de HYG v41 (benchmarks y headless sin red)"""
+import os
+import tempfile
+import numpy as np
+from lazy_import import lazy_module
+from constants import CON_ES
+from catalog_backend import CSVBackend
+from data_manager import DataManager
+
+pd = lazy_module("pandas")
+
+
+def make_catalog(path, n, seed=0):
+    """Escribe un CSV con las columnas de HYG v41 y una distribución de brillo realista"""
+    rng = np.random.default_rng(seed)
+    # Como HYG: el grueso cerca de mag 8.5 y una cola brillante con N(<m) ~ 10^(0.45 m)
+    lo, hi = 10 ** (0.45 * -1.5), 10 ** (0.45 * 7)
+    bright = np.log10(rng.uniform(lo, hi, n)) / 0.45
+    mag = np.where(rng.random(n) < 0.03, bright, rng.normal(8.5, 1.2, n))
+    ids = np.arange(1, n + 1)
+    letters = np.array(list('OBAFGKM'))
+    spect = np.char.add(letters[rng.integers(0, 7, n)], rng.integers(0, 10, n).astype(str))
+    spect = np.where(rng.random(n) < 0.05, '', spect)
+    proper = np.where(rng.random(n) < 0.01, np.char.add('Estrella', ids.astype(str)), '')
+    df = pd.DataFrame({
+        'id': ids,
+        'hip': np.where(mag < 9, ids, np.nan),
+        'proper': proper,
+        'ra': rng.uniform(0, 24, n),
+        'dec': np.degrees(np.arcsin(rng.uniform(-1, 1, n))),
+        'dist': 10 ** rng.uniform(0.1, 3.5, n),
+        'mag': mag,
+        'ci': rng.normal(0.7, 0.4, n),
+        'con': rng.choice(list(CON_ES), n),
+        'spect': spect,
+        'pmra': rng.normal(0, 50, n),
+        'pmdec': rng.normal(0, 50, n),
+        'rv': np.where(rng.random(n) < 0.3, rng.normal(0, 30, n), np.nan),
+        'bayer': np.where(mag < 4.5, rng.choice(['Alp', 'Bet', 'Gam', 'Del', 'Pi-3'], n), ''),
+        'flam': np.where(mag < 6, rng.integers(1, 100, n), -1),
+    })
+    df['flam'] = df['flam'].where(df['flam'] > 0)
+    df.replace('', np.nan).to_csv(path, index=False)
+    return path
+
+
+def make_constellations(df_stars, n_const=88, seed=0):
+    """Constelaciones sintéticas: cadenas de estrellas HIP brillantes"""
+    rng = np.random.default_rng(seed)
+    hips = df_stars.dropna(subset=['hip']).sort_values('mag')['hip'].astype(int).to_numpy()[:n_const * 8]
+    out = []
+    for abbr in list(CON_ES)[:n_const]:
+        chain = rng.permutation(hips)[:8]
+        out.append({'abbr': abbr, 'name_es': CON_ES[abbr],
+                    'pairs': [(int(a), int(b)) for a, b in zip(chain[:-1], chain[1:])]})
+    return out
+
+
+def make_exoplanets(df_stars, n=200, seed=0):
+    """Exoplanetas sintéticos alrededor de estrellas HIP al azar"""
+    rng = np.random.default_rng(seed)
+    hips = rng.choice(df_stars['hip'].dropna().to_numpy(), n, replace=False)
+    return pd.DataFrame({'hostname_match': [f"H{int(h)}" for h in hips], 'hip': hips,
+                         'sy_pnum': rng.integers(1, 5, n), 'pl_name': [f"H{int(h)} b" for h in hips]})
+
+
+def load_synthetic(n, seed=0):
+    """(estrellas, constelaciones, exoplanetas) como DataManager.load_all, sin red.
+
+    El CSV intermedio se escribe en un directorio temporal que se borra al terminar.
+    """
+    with tempfile.TemporaryDirectory(prefix='sky_') as tmp:
+        path = make_catalog(os.path.join(tmp, 'stars.csv'), n, seed)
+        stars = DataManager.load_stars(CON_ES, backend=CSVBackend(path))
+    return stars, make_constellations(stars, seed=seed), make_exoplanets(stars, seed=seed)
@@ -0,0 +1,83 @@
+# tests/test_catalog_backend.py
+"""CSV, Parquet y SQLite devuelven las mismas filas para cada filtro resuelto en el backend.
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from catalog_backend import CatalogBackend, CSVBackend, ParquetBackend, SQLiteBackend  # noqa: E402
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
+COLUMNS = ['id', 'hip', 'ra', 'dec', 'mag']
+FILTERS = {
+    'sin filtros': {},
+    'mag_max': {'mag_max': 5.0},
+    'hip_in': {'hip_in': {3, 10, 42, 77, 999999}},
+    'region': {'region': (4.0, 9.0, -30.0, 45.0)},
+    'region cruza 0h': {'region': (22.0, 2.0, -90.0, 90.0)},
+    'combinados': {'mag_max': 7.0, 'region': (0.0, 12.0, 0.0, 90.0)},
+}
+
+
+class CatalogBackendTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(1)
+        n = 2000
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.csv = os.path.join(cls.tmp.name, 'stars.csv')
+        pd.DataFrame({
+            'id': np.arange(1, n + 1),
+            'hip': np.where(rng.random(n) < 0.8, np.arange(1, n + 1), np.nan),
+            'ra': rng.uniform(0, 24, n),
+            'dec': np.degrees(np.arcsin(rng.uniform(-1, 1, n))),
+            'mag': rng.uniform(-1, 10, n),
+        }).to_csv(cls.csv, index=False)
+        cls.backends = {'csv': CSVBackend(cls.csv),
+                        'sqlite': SQLiteBackend.from_csv(cls.csv, os.path.join(cls.tmp.name, 'stars.db'))}
+        if pyarrow is not None:
+            cls.backends['parquet'] = ParquetBackend.from_csv(cls.csv, os.path.join(cls.tmp.name, 'stars.parquet'))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    @staticmethod
+    def rows(df):
+        return df.sort_values('id').reset_index(drop=True).astype('float64')
+
+    def test_backends_agree(self):
+        full = pd.read_csv(self.csv)
+        for name, kwargs in FILTERS.items():
+            expected = self.rows(full[CatalogBackend._mask(full, **kwargs)][COLUMNS])
+            self.assertGreater(len(expected), 0 if 'hip_in' in kwargs else 10, name)
+            for backend_name, backend in self.backends.items():
+                with self.subTest(filtro=name, backend=backend_name):
+                    got = self.rows(backend.query(COLUMNS, **kwargs))
+                    pd.testing.assert_frame_equal(got, expected, check_exact=False)
+
+    def test_base_is_abstract(self):
+        with self.assertRaises(TypeError):
+            CatalogBackend(self.csv)
+
+    def test_available_columns(self):
+        for name, backend in self.backends.items():
+            with self.subTest(backend=name):
+                self.assertEqual(set(backend.available_columns()), set(COLUMNS))
+
+
+if __name__ == '__main__':
+    unittest.main()
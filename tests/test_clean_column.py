@@ -0,0 +1,61 @@
+# tests/test_clean_column.py
+"""DataManager.clean_column: el camino con procesos da lo mismo que el serial.
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import data_manager  # noqa: E402
+from data_manager import DataManager, _clean_chunk  # noqa: E402
+
+
+class RecordingPool(data_manager.ProcessPoolExecutor):
+    """ProcessPoolExecutor que anota los map() completados (si falla, se cae al serial y queda vacío)"""
+    calls = []
+
+    def __init__(self, *args, **kwargs):
+        RecordingPool.calls.append(kwargs['mp_context'].get_start_method())
+        super().__init__(*args, **kwargs)
+
+    def map(self, fn, *iterables, **kwargs):
+        results = list(super().map(fn, *iterables, **kwargs))
+        RecordingPool.calls.append(len(results))
+        return results
+
+
+class CleanColumnTest(unittest.TestCase):
+    VALUES = ["Orión", "Géminis", "  Alfa   Centauri ", "Ñandú-1", "HIP 123", None, "Orión", "Cruz del Sur"]
+
+    def series(self):
+        return pd.Series(self.VALUES * 40 + [f"Estrella{i}" for i in range(200)], index=range(1000, 1520))
+
+    def expected(self, series):
+        return [("" if v is None else _clean_chunk([v])[0]) for v in series]
+
+    def test_serial(self):
+        s = self.series()
+        out = DataManager.clean_column(s, workers=1)
+        self.assertEqual(out.tolist(), self.expected(s))
+        self.assertTrue(out.index.equals(s.index))
+
+    def test_process_pool_matches_serial(self):
+        s = self.series()
+        RecordingPool.calls = []
+        with mock.patch.object(DataManager, 'PARALLEL_CLEAN_MIN', 10), \
+                mock.patch.object(data_manager, 'ProcessPoolExecutor', RecordingPool):
+            out = DataManager.clean_column(s, workers=2)
+        self.assertEqual(RecordingPool.calls, ['spawn', 2])   # Dos bloques resueltos por el pool
+        self.assertEqual(out.tolist(), self.expected(s))
+        self.assertTrue(out.index.equals(s.index))
+
+
+if __name__ == '__main__':
+    unittest.main()
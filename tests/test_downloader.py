@@ -0,0 +1,148 @@
+# tests/test_downloader.py
+"""Downloader contra un servidor HTTP local (http.server): 200, 206, 304, 416 y concurrencia.
+
+    python -m pytest -q tests
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from downloader import Downloader  # noqa: E402
+
+
+class FakeCatalog:
+    """Archivo remoto con versión (ETag) y registro de los pedidos recibidos"""
+
+    def __init__(self, body, etag):
+        self.body, self.etag = body, etag
+        self.requests = []
+        self.lock = threading.Lock()
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        remote = self.server.remote
+        with remote.lock:
+            remote.requests.append(dict(self.headers))
+            body, etag = remote.body, remote.etag
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        rng = self.headers.get('Range')
+        if rng and self.headers.get('If-Range', etag) == etag:
+            start = int(rng.split('=')[1].split('-')[0])
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(body)}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            chunk = body[start:]
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            chunk = body
+            self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(chunk)))
+        self.end_headers()
+        self.wfile.write(chunk)
+
+
+class DownloaderTest(unittest.TestCase):
+    BODY = bytes(range(256)) * 400
+
+    def setUp(self):
+        self.remote = FakeCatalog(self.BODY, '"v1"')
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.remote = self.remote
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/stars.csv"
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = os.path.join(self.tmp.name, 'stars.csv')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def read(self):
+        with open(self.dest, 'rb') as f:
+            return f.read()
+
+    def write_part(self, data, etag=None):
+        with open(self.dest + '.part', 'wb') as f:
+            f.write(data)
+        if etag:
+            with open(self.dest + '.part.json', 'w') as f:
+                json.dump({'etag': etag}, f)
+
+    def test_200_full_download(self):
+        self.assertTrue(Downloader().fetch(self.url, self.dest))
+        self.assertEqual(self.read(), self.BODY)
+        self.assertEqual(Downloader._read_meta(self.dest), {'etag': '"v1"'})
+        self.assertFalse(os.path.exists(self.dest + '.part'))
+        self.assertFalse(os.path.exists(self.dest + '.part.json'))
+
+    def test_304_revalidate_unchanged(self):
+        Downloader().fetch(self.url, self.dest)
+        self.assertFalse(Downloader().fetch(self.url, self.dest, revalidate=True))
+        self.assertEqual(self.remote.requests[-1].get('If-None-Match'), '"v1"')
+        self.assertEqual(self.read(), self.BODY)
+
+    def test_revalidate_changed(self):
+        Downloader().fetch(self.url, self.dest)
+        self.remote.body, self.remote.etag = b"nuevo", '"v2"'
+        self.assertTrue(Downloader().fetch(self.url, self.dest, revalidate=True))
+        self.assertEqual(self.read(), b"nuevo")
+
+    def test_206_resume(self):
+        self.write_part(self.BODY[:1000], etag='"v1"')
+        self.assertTrue(Downloader().fetch(self.url, self.dest))
+        sent = self.remote.requests[-1]
+        self.assertEqual(sent.get('Range'), 'bytes=1000-')
+        self.assertEqual(sent.get('If-Range'), '"v1"')
+        self.assertEqual(self.read(), self.BODY)
+
+    def test_resume_after_remote_changed(self):
+        # El '.part' es de la versión anterior: If-Range no coincide y llega el archivo entero
+        self.write_part(b"x" * 1000, etag='"v0"')
+        self.assertTrue(Downloader().fetch(self.url, self.dest))
+        self.assertEqual(self.read(), self.BODY)
+
+    def test_part_without_validator_is_discarded(self):
+        self.write_part(b"x" * 1000)
+        self.assertTrue(Downloader().fetch(self.url, self.dest))
+        self.assertNotIn('Range', self.remote.requests[-1])
+        self.assertEqual(self.read(), self.BODY)
+
+    def test_416_restarts(self):
+        self.write_part(self.BODY + b"sobra", etag='"v1"')
+        self.assertTrue(Downloader().fetch(self.url, self.dest))
+        self.assertEqual(len(self.remote.requests), 2)
+        self.assertNotIn('Range', self.remote.requests[-1])
+        self.assertEqual(self.read(), self.BODY)
+
+    def test_concurrent_fetch_same_dest(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: Downloader().fetch(self.url, self.dest), range(8)))
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(len(self.remote.requests), 1)
+        self.assertEqual(self.read(), self.BODY)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# timezones.py
+"""Zona horaria del observador a partir de (lat, lon), sin consultas por red.
+
+Camino principal: timezonefinder (requirements.txt), con los polígonos reales de las
+zonas; en el mar devuelve Etc/GMT. Si no está instalado o no responde: ciudad conocida
+de CIUDADES (hasta CITY_RADIUS_DEG) y, como último recurso, la zona de la ciudad más
+cercana de zone.tab (viene con pytz). Ese recurso es aproximado: cerca de una frontera
+puede elegir la zona del vecino aunque tenga otro horario (Vigo o Badajoz -> Lisboa,
+una hora menos). El resultado se memoriza por coordenada redondeada.
+"""
+import os
+from functools import lru_cache
+import numpy as np
+import pytz
+import astrometry
+from constants import CIUDADES
+from star_index import NearestIndex
+
+CITY_RADIUS_DEG = 0.5      # Hasta esta distancia vale la zona de una ciudad de CIUDADES
+ZONE_MAX_KM = 1500         # Más lejos de toda ciudad de zone.tab (océano): Etc/GMT
+EARTH_KM = 6371.0
+
+
+@lru_cache(maxsize=1)
+def _finder():
+    """TimezoneFinder (en requirements.txt); None si falta en el entorno"""
+    try:
+        from timezonefinder import TimezoneFinder
+        return TimezoneFinder(in_memory=True)
+    except ImportError:
+        return None
+
+
+def _parse_iso6709(coord):
+    """'+4230+00131' / '-345300-0582700' -> (lat, lon) en grados"""
+    split = max(coord.rfind('+'), coord.rfind('-'))
+    vals = []
+    for part, deg_digits in ((coord[:split], 2), (coord[split:], 3)):
+        sign, digits = (-1 if part[0] == '-' else 1), part[1:]
+        fields = [digits[:deg_digits]] + [digits[i:i + 2] for i in range(deg_digits, len(digits), 2)]
+        vals.append(sign * sum(int(f) / 60 ** k for k, f in enumerate(fields)))
+    return tuple(vals)
+
+
+@lru_cache(maxsize=1)
+def _zone_index():
+    """Índice 3D (vectores unitarios) de las ciudades principales de cada zona"""
+    path = os.path.join(os.path.dirname(pytz.__file__), 'zoneinfo', 'zone.tab')
+    names, coords = [], []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#') or not line.strip(): continue
+            fields = line.rstrip('\n').split('\t')
+            if fields[2] not in pytz.all_timezones_set: continue
+            names.append(fields[2])
+            coords.append(_parse_iso6709(fields[1]))
+    lat, lon = np.array(coords).T
+    return names, NearestIndex(astrometry.unit_vectors(lon / 15, lat))
+
+
+def _nearest_city(lat, lon):
+    best = min(CIUDADES.values(), key=lambda c: (c[0] - lat) ** 2 + ((c[1] - lon) * np.cos(np.radians(lat))) ** 2)
+    if np.hypot(best[0] - lat, (best[1] - lon) * np.cos(np.radians(lat))) <= CITY_RADIUS_DEG:
+        return best[2]
+    return None
+
+
+def _gmt_offset(lon):
+    """Etc/GMT por longitud (el signo de Etc está invertido: Etc/GMT+3 es UTC-3)"""
+    hours = int(round(lon / 15))
+    return "Etc/GMT" if hours == 0 else f"Etc/GMT{-hours:+d}"
+
+
+@lru_cache(maxsize=1024)
+def _resolve(lat, lon):
+    finder = _finder()
+    if finder is not None:
+        name = finder.timezone_at(lat=lat, lng=lon)
+        if name in pytz.all_timezones_set: return name
+    name = _nearest_city(lat, lon)
+    if name: return name
+    # Último recurso (sin timezonefinder): aproximado cerca de las fronteras
+    names, index = _zone_index()
+    # Cuerda máxima en la esfera unitaria para ZONE_MAX_KM
+    row = index.query(astrometry.unit_vectors(lon / 15, lat), max_dist=2 * np.sin(ZONE_MAX_KM / EARTH_KM / 2))
+    return names[row] if row is not None else _gmt_offset(lon)
+
+
+def resolve(lat, lon):
+    """Nombre IANA de la zona horaria en (lat, lon). Memorizado a ~100 m"""
+    return _resolve(round(float(lat), 3), round(float(lon), 3))
+
+
+def observer_tz(lat, lon):
+    """pytz timezone del observador"""
+    return pytz.timezone(resolve(lat, lon))
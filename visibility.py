@@ -0,0 +1,178 @@
+# visibility.py
+import datetime
+import threading
+from functools import lru_cache
+import numpy as np
+from lazy_import import lazy_module
+from engine import SkyEngine
+
+pd = lazy_module("pandas")
+ephem = lazy_module("ephem")
+
+SIDEREAL_RATE = 1.00273790935   # Horas sidéreas por hora solar
+H0_STAR = -0.5667                # Altura aparente del horizonte con refracción (°)
+TWILIGHT = {'civil': '-6', 'nautico': '-12', 'astronomico': '-18'}
+TWILIGHT_NAMES = {'civil': 'civil', 'nautico': 'náutica', 'astronomico': 'astronómica'}
+
+
+class VisibilityCalculator:
+    """Salida, culminación, puesta y ventana de visibilidad nocturna de todo el catálogo.
+
+    Las estrellas se resuelven en forma cerrada a partir del ángulo horario
+    (cos H0 = (sin h0 - sin φ sin δ) / (cos φ cos δ)); los planetas con ephem.
+    Los resultados se cachean por (sitio, fecha, magnitud límite).
+    """
+
+    def __init__(self, df_stars):
+        cols = ['proper_clean', 'con_es', 'mag', 'ra', 'dec']
+        self.stars = df_stars[cols].sort_values('mag').reset_index(drop=True)
+        self._lock = threading.Lock()
+        self._tonight = lru_cache(maxsize=64)(self._compute)
+
+    def tonight(self, lat, lon, date, tz, mag_max=4.0, twilight='nautico'):
+        """Tabla ordenable de ventanas de visibilidad para la noche que empieza en 'date'"""
+        key = (round(float(lat), 2), round(float(lon), 2), date, str(tz), float(mag_max), twilight)
+        with self._lock:
+            return self._tonight(*key).copy()
+
+    @staticmethod
+    def night_window(lat, lon, date, tz, twilight='nautico'):
+        """(inicio, fin) de la noche en UTC: del crepúsculo vespertino al matutino"""
+        obs = ephem.Observer()
+        obs.lat, obs.lon = str(lat), str(lon)
+        obs.horizon = TWILIGHT[twilight]
+        # Mediodía local del día pedido: la próxima puesta es la de esa tarde
+        noon = tz.localize(datetime.datetime.combine(date, datetime.time(12))).astimezone(datetime.timezone.utc)
+        obs.date = noon
+        sun = ephem.Sun()
+        try:
+            start = obs.next_setting(sun, use_center=True).datetime()
+            obs.date = start
+            end = obs.next_rising(sun, use_center=True).datetime()
+        except ephem.AlwaysUpError:      # Sol de medianoche: no hay noche
+            return None
+        except ephem.NeverUpError:       # Noche polar: 24 h
+            start = noon.replace(tzinfo=None)
+            end = start + datetime.timedelta(hours=24)
+        utc = datetime.timezone.utc
+        return start.replace(tzinfo=utc), end.replace(tzinfo=utc)
+
+    @staticmethod
+    def star_events(ra_hrs, dec_deg, lat, lon, start, end, h0=H0_STAR):
+        """Eventos vectorizados (horas UTC relativas a 'start') para todas las estrellas.
+
+        Devuelve dict con arrays: transit, rise, set, max_alt, vis_from, vis_to, hours.
+        rise/set son NaN si la estrella es circumpolar o nunca sale. Si la estrella está
+        arriba al anochecer y otra vez al amanecer, vis_from/vis_to/hours son del tramo
+        más largo.
+        """
+        ra = np.asarray(ra_hrs, dtype=np.float64)
+        dec_r = np.radians(np.asarray(dec_deg, dtype=np.float64))
+        phi = np.radians(lat)
+        night = (end - start).total_seconds() / 3600.0
+        mid = start + (end - start) / 2
+
+        # Culminación más cercana a la medianoche de la observación
+        lst_mid = np.degrees(SkyEngine.get_lst(lon, mid)) / 15.0
+        ha_mid = (lst_mid - ra + 12) % 24 - 12
+        transit = night / 2 - ha_mid / SIDEREAL_RATE
+
+        cos_h0 = (np.sin(np.radians(h0)) - np.sin(phi) * np.sin(dec_r)) / (np.cos(phi) * np.cos(dec_r) + 1e-12)
+        always = cos_h0 <= -1
+        never = cos_h0 >= 1
+        half = np.degrees(np.arccos(np.clip(cos_h0, -1, 1))) / 15.0 / SIDEREAL_RATE   # Semiarco (h)
+        rise = np.where(always | never, np.nan, transit - half)
+        set_ = np.where(always | never, np.nan, transit + half)
+
+        # Intervalos sobre el horizonte en los ciclos -1, 0, +1 recortados a la noche
+        day = 24.0 / SIDEREAL_RATE
+        shifts = np.array([-day, 0.0, day])[:, None]
+        lo = np.clip(transit - half + shifts, 0, night)
+        hi = np.clip(transit + half + shifts, 0, night)
+        length = np.maximum(hi - lo, 0)
+        best = np.argmax(length, axis=0)
+        idx = np.arange(len(ra))
+        vis_from = np.where(always, 0.0, lo[best, idx])
+        vis_to = np.where(always, night, hi[best, idx])
+        hours = np.where(always, night, length[best, idx])   # Mismo tramo que vis_from/vis_to
+        hours = np.where(never, 0.0, hours)
+        vis_from = np.where(hours > 0, vis_from, np.nan)
+        vis_to = np.where(hours > 0, vis_to, np.nan)
+
+        max_alt = 90 - np.abs(np.degrees(phi - dec_r))
+        return {'transit': transit, 'rise': rise, 'set': set_, 'max_alt': max_alt,
+                'vis_from': vis_from, 'vis_to': vis_to, 'hours': hours}
+
+    @staticmethod
+    def planet_events(lat, lon, start, end):
+        """Filas con los eventos de Sol/Luna/planetas (ephem) dentro de la noche"""
+        from constants import new_planets, CON_ES
+        obs = ephem.Observer()
+        obs.lat, obs.lon = str(lat), str(lon)
+        rows = []
+        utc = datetime.timezone.utc
+        for name, body in new_planets().items():
+            if name == 'Sol': continue
+            obs.date = start
+            body.compute(obs)
+            row = {'Nombre': name, 'Tipo': 'Planeta' if name != 'Luna' else 'Luna',
+                   'Mag': round(float(body.mag), 2), 'Const': CON_ES.get(ephem.constellation(body)[0], ephem.constellation(body)[1])}
+            try:
+                up = body.alt > 0
+                rise = obs.previous_rising(body) if up else obs.next_rising(body)
+                obs.date = rise
+                set_ = obs.next_setting(body)
+                obs.date = rise
+                transit = obs.next_transit(body)
+                rise, set_, transit = (e.datetime().replace(tzinfo=utc) for e in (rise, set_, transit))
+                vis_from, vis_to = max(rise, start), min(set_, end)
+            except ephem.AlwaysUpError:
+                rise = set_ = None
+                obs.date = start
+                transit = obs.next_transit(body).datetime().replace(tzinfo=utc)
+                vis_from, vis_to = start, end
+            except ephem.NeverUpError:
+                rise = set_ = transit = None
+                vis_from = vis_to = None
+            obs.date = transit or start
+            body.compute(obs)
+            hours = (vis_to - vis_from).total_seconds() / 3600 if vis_from and vis_to and vis_to > vis_from else 0.0
+            row.update({'Sale': rise, 'Culmina': transit, 'Se pone': set_,
+                        'Alt. máx': round(float(np.degrees(body.alt)), 1) if transit else None,
+                        'Visible desde': vis_from if hours else None, 'Visible hasta': vis_to if hours else None,
+                        'Horas': round(hours, 2)})
+            rows.append(row)
+        return rows
+
+    def _compute(self, lat, lon, date, tz_name, mag_max, twilight):
+        import pytz
+        tz = pytz.timezone(tz_name)
+        window = self.night_window(lat, lon, date, tz, twilight)
+        columns = ['Nombre', 'Tipo', 'Mag', 'Const', 'Sale', 'Culmina', 'Se pone',
+                   'Alt. máx', 'Visible desde', 'Visible hasta', 'Horas']
+        if window is None:
+            return pd.DataFrame(columns=columns)
+        start, end = window
+
+        stars = self.stars[self.stars['mag'] <= mag_max]
+        ev = self.star_events(stars['ra'], stars['dec'], lat, lon, start, end)
+
+        def to_time(hours):
+            return (pd.Timestamp(start) + pd.to_timedelta(hours, unit='h')).tz_convert(tz)
+
+        df = pd.DataFrame({
+            'Nombre': stars['proper_clean'].to_numpy(), 'Tipo': 'Estrella',
+            'Mag': stars['mag'].round(2).to_numpy(), 'Const': stars['con_es'].to_numpy(),
+            'Sale': to_time(ev['rise']), 'Culmina': to_time(ev['transit']), 'Se pone': to_time(ev['set']),
+            'Alt. máx': np.round(ev['max_alt'], 1),
+            'Visible desde': to_time(ev['vis_from']), 'Visible hasta': to_time(ev['vis_to']),
+            'Horas': np.round(ev['hours'], 2),
+        })
+        df = df[df['Horas'] > 0]
+
+        planets = pd.DataFrame(self.planet_events(lat, lon, start, end), columns=columns)
+        planets = planets[planets['Horas'] > 0]
+        for c in ('Sale', 'Culmina', 'Se pone', 'Visible desde', 'Visible hasta'):
+            planets[c] = pd.to_datetime(planets[c], utc=True).dt.tz_convert(tz)
+        out = pd.concat([planets, df], ignore_index=True)
+        return out.sort_values(['Horas', 'Mag'], ascending=[False, True]).reset_index(drop=True)